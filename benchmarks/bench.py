@@ -0,0 +1,469 @@
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.processor import ImageProcessor
+from src.core.view import ImageView
+
+# 一张测试图像：来源、目标像素数（百万）、BGR 图像、文档角点（原图坐标）
+Sample = namedtuple('Sample', ['source', 'megapixels', 'image', 'corners'])
+
+DEFAULT_MEGAPIXELS = (1, 4, 12, 48)
+DEFAULT_SOURCES = ('synthetic', 'doc3')
+
+
+def synthetic_page(megapixels, seed=0):
+    """生成一张合成的手机拍摄文档：白纸上排满文字，透视放置在桌面上，带一道阴影"""
+    rng = np.random.default_rng(seed)
+    width = int(round(np.sqrt(megapixels * 1e6 * 3 / 4)))
+    height = int(round(width * 4 / 3))
+
+    # A4 比例的纸张，按行写满随机文字
+    page_w, page_h = int(width * 0.8), int(width * 0.8 * 297 / 210)
+    page = np.full((page_h, page_w, 3), 245, np.uint8)
+    scale = page_w / 1000
+    line_height = max(int(28 * scale), 4)
+    for y in range(int(80 * scale), page_h - int(80 * scale), line_height):
+        text = ''.join(rng.choice(list('abcdefghijklmnopqrstuvwxyz     0123456789'), 60))
+        cv2.putText(page, text, (int(60 * scale), y), cv2.FONT_HERSHEY_SIMPLEX, 0.55 * scale,
+                    (30, 30, 30), max(int(scale), 1), cv2.LINE_AA)
+
+    # 透视放置到桌面上
+    margin_x, margin_y = width * 0.08, height * 0.06
+    corners = np.array([
+        [margin_x + rng.uniform(0, width * 0.04), margin_y + rng.uniform(0, height * 0.03)],
+        [width - margin_x - rng.uniform(0, width * 0.04), margin_y + rng.uniform(0, height * 0.03)],
+        [width - margin_x * 0.5, height - margin_y],
+        [margin_x * 0.5, height - margin_y],
+    ], dtype=np.float32)
+    src = np.array([[0, 0], [page_w, 0], [page_w, page_h], [0, page_h]], dtype=np.float32)
+    desk = np.full((height, width, 3), (70, 90, 110), np.uint8)
+    image = cv2.warpPerspective(page, cv2.getPerspectiveTransform(src, corners), (width, height),
+                                dst=desk, borderMode=cv2.BORDER_TRANSPARENT)
+
+    # 从左上到右下逐渐变暗的阴影
+    ramp = np.linspace(1.0, 0.55, width, dtype=np.float32)[None, :] * np.linspace(1.0, 0.8, height,
+                                                                                    dtype=np.float32)[:, None]
+    image = (image * ramp[:, :, None]).astype(np.uint8)
+    return image, corners
+
+
+def example_page(name, megapixels):
+    """把 examples 中的图像缩放到指定像素数，角点取内缩 4% 的四边形"""
+    paths = sorted((project_root / 'examples').glob(f'{name}.*'))
+    if not paths:
+        raise FileNotFoundError(f"examples 中没有 {name}")
+    image = cv2.imread(str(paths[0]))
+    factor = np.sqrt(megapixels * 1e6 / (image.shape[0] * image.shape[1]))
+    size = (int(round(image.shape[1] * factor)), int(round(image.shape[0] * factor)))
+    image = cv2.resize(image, size, interpolation=cv2.INTER_AREA if factor < 1 else cv2.INTER_CUBIC)
+    width, height = size
+    corners = np.array([[0.04 * width, 0.04 * height], [0.96 * width, 0.04 * height],
+                        [0.96 * width, 0.96 * height], [0.04 * width, 0.96 * height]], dtype=np.float32)
+    return image, corners
+
+
+def make_sample(source, megapixels):
+    if source == 'synthetic':
+        image, corners = synthetic_page(megapixels)
+    else:
+        image, corners = example_page(source, megapixels)
+    return Sample(source, megapixels, image, corners)
+
+
+def random_weights(workdir):
+    """权重文件不存在时，生成固定随机种子初始化的权重（只用于测速，结果没有意义）"""
+    import torch
+    from torchvision.models.segmentation import deeplabv3_mobilenet_v3_large
+    from src.core.model import UVDocnet
+
+    torch.manual_seed(0)
+    model_path = os.path.join(workdir, 'segmentation_random.pth')
+    torch.save(deeplabv3_mobilenet_v3_large(num_classes=2, weights_backbone=None).state_dict(), model_path)
+    unwarp_path = os.path.join(workdir, 'unwarp_random.pkl')
+    torch.save({'model_state': UVDocnet(num_filter=32, kernel_size=5).state_dict()}, unwarp_path)
+    return model_path, unwarp_path
+
+
+def build_processor(workdir):
+    """创建处理器，返回 (处理器, 是否使用随机权重)"""
+    model_path = str(project_root / ImageProcessor.DEFAULT_MODEL_PATH)
+    unwarp_path = str(project_root / ImageProcessor.UNWARP_MODEL_PATH)
+    random_init = not (os.path.exists(model_path) and os.path.exists(unwarp_path))
+    if random_init:
+        model_path, unwarp_path = random_weights(workdir)
+    processor = ImageProcessor(model_path)
+    processor.unwarp_model_path = unwarp_path
+    return processor, random_init
+
+
+def _detect_or_fallback(processor, sample):
+    """随机权重检测不到边界时使用已知角点，保证端到端流程能走完"""
+    corners = processor.detect_document(sample.image)
+    return sample.corners.copy() if corners is None else corners
+
+
+def _end_to_end(processor, sample):
+    corners = _detect_or_fallback(processor, sample)
+    return processor.binarize(processor.perspective_transform(sample.image, corners))
+
+
+def _with_settings(processor, settings, func):
+    """临时覆盖处理器属性后调用 func"""
+    defaults = {name: getattr(processor, name) for name in settings}
+    for name, value in settings.items():
+        setattr(processor, name, value)
+    try:
+        return func()
+    finally:
+        for name, value in defaults.items():
+            setattr(processor, name, value)
+
+
+def _binarize_case(remove_shadow, **settings):
+    """settings 为临时覆盖的处理器属性（如 shadow_method），此时用默认设置的输出作为参照计算一致率"""
+    def case(processor, sample):
+        # 二值化的输入是透视变换后的页面，准备工作不计时
+        warped = processor.perspective_transform(sample.image, sample.corners.copy())
+
+        def run():
+            return _with_settings(processor, settings,
+                                  lambda: processor.binarize(warped, remove_shadow=remove_shadow))
+
+        run.reference = processor.binarize(warped, remove_shadow=remove_shadow) if settings else None
+        return run
+    return case
+
+
+def _scan_case(**settings):
+    """已知角点的透视变换加二值化，settings 同 _binarize_case"""
+    def case(processor, sample):
+        def scan():
+            return processor.binarize(processor.perspective_transform(sample.image, sample.corners.copy()))
+
+        def run():
+            return _with_settings(processor, settings, scan)
+
+        run.reference = scan() if settings else None
+        return run
+    return case
+
+
+def _resized_scan(processor, sample, dpi=300):
+    """先按角点边长透视变换，再缩放到 A4 指定 DPI 后二值化（单次采样到目标尺寸之前的做法）"""
+    warped = processor.perspective_transform(sample.image, sample.corners.copy())
+    default_dpi = processor.output_dpi
+    processor.output_dpi = dpi
+    try:
+        size = processor.output_size_for(warped.shape[1], warped.shape[0])
+    finally:
+        processor.output_dpi = default_dpi
+    return processor.binarize(cv2.resize(warped, size, interpolation=cv2.INTER_AREA))
+
+
+def _rotated_case(lazy):
+    """顺时针旋转 90 度后透视变换加二值化：lazy 时旋转合进单应矩阵，否则先用 cv2.rotate 旋转整张图像"""
+    def case(processor, sample):
+        view = ImageView(sample.image)
+        view.rotate90(True)
+        corners = view.map_points(sample.corners)
+
+        def rotate_then_scan():
+            rotated = cv2.rotate(sample.image, cv2.ROTATE_90_CLOCKWISE)
+            return processor.binarize(processor.perspective_transform(rotated, corners))
+
+        if not lazy:
+            return rotate_then_scan
+
+        def run():
+            return processor.binarize(processor.perspective_transform(view, corners))
+
+        run.reference = rotate_then_scan()
+        return run
+    return case
+
+
+def _offframe_case(**settings):
+    """角点超出图像边界的透视变换：样本角点绕中心放大 1.25 倍"""
+    def case(processor, sample):
+        center = sample.corners.mean(axis=0)
+        corners = ((sample.corners - center) * 1.25 + center).astype(np.float32)
+
+        def run():
+            return _with_settings(processor, settings, lambda: processor.perspective_transform(sample.image, corners))
+
+        run.reference = processor.perspective_transform(sample.image, corners) if settings else None
+        return run
+    return case
+
+
+def _detect_case(**settings):
+    """边界检测（分割推理 + 提取角点），settings 为临时覆盖的处理器属性（如 segmentation_size）"""
+    def case(processor, sample):
+        return lambda: _with_settings(processor, settings, lambda: processor.detect_document(sample.image))
+    return case
+
+
+def _quad_case(**settings):
+    """分割掩码提取角点：掩码由样本角点画出（不依赖权重），settings 同 _binarize_case"""
+    def case(processor, sample):
+        size = processor.SEGMENTATION_SIZE
+        height, width = sample.image.shape[:2]
+        mask = np.zeros((size, size), np.uint8)
+        cv2.fillPoly(mask, [np.round(sample.corners * (size / width, size / height)).astype(np.int32)], 1)
+
+        def extract():
+            return processor._mask_to_corners(mask, (height, width))
+
+        def run():
+            return _with_settings(processor, settings, extract)
+
+        run.reference = extract() if settings else None
+        return run
+    return case
+
+
+# 每个用例接收 (处理器, 样本)，完成准备工作后返回被计时的无参函数
+CASES = {
+    'detect': _detect_case(),
+    'detect_192': _detect_case(segmentation_size=192),
+    'detect_256': _detect_case(segmentation_size=256),
+    # 随机权重时掩码没有意义，auto 通常会升到最高一级，真实权重下的吞吐量要用实际照片测
+    'detect_auto': _detect_case(segmentation_size='auto'),
+    'quad': _quad_case(),
+    'quad_legacy': _quad_case(quad_method='legacy'),
+    'perspective': lambda processor, sample: lambda: processor.perspective_transform(sample.image,
+                                                                                    sample.corners.copy()),
+    'perspective_mono': lambda processor, sample: lambda: processor.perspective_transform(
+        sample.image, sample.corners.copy(), mono=True),
+    'perspective_offframe': _offframe_case(),
+    'perspective_offframe_copy': _offframe_case(copy_padding=True),
+    'scan': _scan_case(),
+    'scan_resize_300dpi': lambda processor, sample: lambda: _resized_scan(processor, sample),
+    'scan_300dpi': _scan_case(output_dpi=300),
+    'scan_rotated': _rotated_case(lazy=True),
+    'scan_rotated_copy': _rotated_case(lazy=False),
+    'scan_mono': _scan_case(mono_warp=True),
+    'scan_mono_cubic': _scan_case(mono_warp=True, warp_interpolation='cubic'),
+    'binarize': _binarize_case(False),
+    'binarize_shadow': _binarize_case(True),
+    'binarize_shadow_pyramid': _binarize_case(True, shadow_method='pyramid'),
+    'binarize_sauvola': _binarize_case(False, binarize_engine='sauvola'),
+    'binarize_niblack': _binarize_case(False, binarize_engine='niblack'),
+    # 按 CPU 核数分条带并行，一致率应为 1
+    'binarize_mt': _binarize_case(False, binarize_threads=os.cpu_count() or 1),
+    'binarize_shadow_mt': _binarize_case(True, binarize_threads=os.cpu_count() or 1),
+    'unwarp': lambda processor, sample: lambda: processor.unwarp_document(sample.image),
+    'end_to_end': lambda processor, sample: lambda: _end_to_end(processor, sample),
+    'end_to_end_unwarp': lambda processor, sample: lambda: processor.binarize(processor.unwarp_document(sample.image)),
+}
+
+
+def _read_status_kb(field):
+    try:
+        with open('/proc/self/status') as f:
+            match = re.search(rf'{field}:\s+(\d+)', f.read())
+        return int(match.group(1)) if match else None
+    except OSError:
+        return None
+
+
+def _reset_peak_rss():
+    """重置进程的峰值常驻内存（Linux），其他平台返回 False"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb():
+    peak = _read_status_kb('VmHWM')
+    if peak is None:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            peak //= 1024
+    return peak
+
+
+def run_case(name, processor, sample, repeat, warmup):
+    """计时一个用例，返回结果字典"""
+    result = {
+        'case': name,
+        'source': sample.source,
+        'megapixels': sample.megapixels,
+        'shape': list(sample.image.shape),
+    }
+    try:
+        func = CASES[name](processor, sample)
+
+        # 峰值内存包含预热：之后的调用会复用已经驻留的内存，单看计时部分会低估
+        baseline_kb = _read_status_kb('VmRSS')
+        peak_reset = _reset_peak_rss()
+        for _ in range(warmup):
+            func()
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = func()
+            samples.append(time.perf_counter() - start)
+        peak_kb = _peak_rss_kb()
+        # 有参照输出的用例（同一阶段的另一种实现）记录与参照逐像素一致的比例
+        reference = getattr(func, 'reference', None)
+        if reference is not None and reference.shape == output.shape:
+            result['agreement'] = float((output == reference).mean())
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+
+    samples = np.array(samples)
+    mean = float(samples.mean())
+    result.update({
+        'repeat': repeat,
+        'mean_s': mean,
+        'min_s': float(samples.min()),
+        'p50_s': float(np.percentile(samples, 50)),
+        'p90_s': float(np.percentile(samples, 90)),
+        'p99_s': float(np.percentile(samples, 99)),
+        'images_per_second': 1 / mean if mean > 0 else None,
+        'megapixels_per_second': sample.image.shape[0] * sample.image.shape[1] / 1e6 / mean if mean > 0 else None,
+        'peak_rss_mb': peak_kb / 1024 if peak_kb else None,
+        # 峰值相对用例开始时常驻内存的增量；不能重置峰值的平台上为整个进程的峰值
+        'peak_increase_mb': (peak_kb - baseline_kb) / 1024 if peak_reset and baseline_kb else None,
+    })
+    return result
+
+
+def environment(random_init, threads):
+    import torch
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'threads': threads,
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'torch': torch.__version__,
+        'random_weights': random_init,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results, baseline, threshold):
+    """与基线比较 p50 延迟，返回变慢超过 threshold 的用例"""
+    reference = {(r['case'], r['source'], r['megapixels']): r
+                 for r in baseline['results'] if 'p50_s' in r}
+    regressions = []
+    print(f"\n与基线比较（p50，阈值 {threshold:.0%}）:")
+    for result in results:
+        key = (result['case'], result['source'], result['megapixels'])
+        if key not in reference or 'p50_s' not in result:
+            continue
+        old, new = reference[key]['p50_s'], result['p50_s']
+        change = new / old - 1 if old > 0 else 0.0
+        mark = ''
+        if change > threshold:
+            mark = '  变慢'
+            regressions.append(key)
+        elif change < -threshold:
+            mark = '  变快'
+        print(f"  {key[0]:<28}{key[1]:<12}{key[2]:>4} MP  {old * 1000:>10.1f} -> {new * 1000:>10.1f} ms"
+              f"  {change:+7.1%}{mark}")
+    return regressions
+
+
+def print_header():
+    print(f"{'用例':<28}{'来源':<12}{'MP':>4}{'p50(ms)':>10}{'p90(ms)':>10}{'张/秒':>8}{'MP/秒':>8}{'峰值增量(MB)':>14}")
+
+
+def print_result(r):
+    if 'error' in r:
+        print(f"{r['case']:<28}{r['source']:<12}{r['megapixels']:>4}  失败: {r['error']}")
+        return
+    peak = r['peak_increase_mb'] if r['peak_increase_mb'] is not None else r['peak_rss_mb']
+    print(f"{r['case']:<28}{r['source']:<12}{r['megapixels']:>4}{r['p50_s'] * 1000:>10.1f}"
+          f"{r['p90_s'] * 1000:>10.1f}{r['images_per_second']:>8.2f}{r['megapixels_per_second']:>8.2f}"
+          f"{peak:>14.0f}" + (f"  一致率 {r['agreement']:.4f}" if 'agreement' in r else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PureScan 各处理阶段与端到端的性能测试')
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES), help='要运行的用例')
+    parser.add_argument('--megapixels', nargs='+', type=float, default=list(DEFAULT_MEGAPIXELS),
+                        help='测试图像的像素数（百万）')
+    parser.add_argument('--sources', nargs='+', default=list(DEFAULT_SOURCES),
+                        help='测试图像来源：synthetic（合成）或 examples 中的文件名（不含扩展名）')
+    parser.add_argument('-n', '--repeat', type=int, default=3, help='每个用例的计时次数')
+    parser.add_argument('--warmup', type=int, default=1, help='每个用例计时前的预热次数')
+    parser.add_argument('--threads', type=int, default=None, help='torch / OpenCV 线程数')
+    parser.add_argument('--unwarp-memory', type=float, metavar='MB', help='扭曲矫正分块重采样的临时内存上限')
+    parser.add_argument('--unwarp-backend', choices=ImageProcessor.UNWARP_BACKENDS, default='torch',
+                        help='扭曲矫正重采样后端')
+    parser.add_argument('-o', '--output', help='结果写入 JSON 文件（可作为之后的基线）')
+    parser.add_argument('--baseline', help='与之前保存的 JSON 结果比较')
+    parser.add_argument('--threshold', type=float, default=0.1, help='判定变慢的相对阈值')
+    parser.add_argument('--json', action='store_true', help='输出 JSON')
+    args = parser.parse_args()
+
+    import torch
+    torch.manual_seed(0)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+        cv2.setNumThreads(args.threads)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        processor, random_init = build_processor(workdir)
+        if args.unwarp_memory:
+            processor.unwarp_memory_budget = int(args.unwarp_memory * 2 ** 20)
+        processor.unwarp_backend = args.unwarp_backend
+        # 模型加载不计入任何用例
+        processor._ensure_model_loaded()
+        if 'unwarp' in args.cases or 'end_to_end_unwarp' in args.cases:
+            processor._ensure_unwarp_model_loaded()
+
+        results = []
+        if not args.json:
+            print_header()
+        for megapixels in args.megapixels:
+            megapixels = int(megapixels) if float(megapixels).is_integer() else megapixels
+            for source in args.sources:
+                sample = make_sample(source, megapixels)
+                for name in args.cases:
+                    results.append(run_case(name, processor, sample, args.repeat, args.warmup))
+                    if not args.json:
+                        print_result(results[-1])
+                del sample
+
+    report = {'environment': environment(random_init, args.threads or torch.get_num_threads()),
+              'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+async def send_request(reader, writer, path, body):
+    """在已有连接上发送一个 POST 请求，返回状态码和响应体"""
+    writer.write((f"POST {path} HTTP/1.1\r\n"
+                  f"Host: localhost\r\n"
+                  f"Content-Type: application/octet-stream\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, path, bodies, counter, total, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            index = counter[0]
+            if index >= total:
+                return
+            counter[0] += 1
+            start = time.perf_counter()
+            status, _ = await send_request(reader, writer, path, bodies[index % len(bodies)])
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(args):
+    bodies = [Path(p).read_bytes() for p in args.images]
+    latencies, statuses, counter = [], {}, [0]
+
+    # 预热：模型首次推理较慢，不计入统计
+    for _ in range(args.warmup):
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+        await send_request(reader, writer, args.path, bodies[0])
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(args.host, args.port, args.path, bodies, counter, args.requests, latencies, statuses)
+        for _ in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'concurrency': args.concurrency,
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p95': float(np.percentile(latencies_ms, 95)),
+            'p99': float(np.percentile(latencies_ms, 99)),
+            'mean': float(latencies_ms.mean()),
+            'max': float(latencies_ms.max()),
+        },
+        'status_codes': statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PureScan 扫描服务压测工具（仅用于本机服务）')
+    parser.add_argument('images', nargs='+', help='请求使用的图像文件，循环发送')
+    parser.add_argument('--host', default='127.0.0.1', help='服务地址')
+    parser.add_argument('--port', type=int, default=8000, help='服务端口')
+    parser.add_argument('--path', default='/scan', help='请求路径（可带查询参数，如 /scan?unwarp=1）')
+    parser.add_argument('-n', '--requests', type=int, default=100, help='总请求数')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='并发连接数')
+    parser.add_argument('--warmup', type=int, default=2, help='预热请求数')
+    parser.add_argument('--json', action='store_true', help='输出 JSON')
+    args = parser.parse_args()
+
+    if args.host not in ('127.0.0.1', 'localhost', '::1'):
+        parser.error('只允许压测本机服务')
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    latency = result['latency_ms']
+    print(f"请求数: {result['requests']}，并发: {result['concurrency']}，耗时: {result['seconds']:.2f} 秒")
+    print(f"吞吐量: {result['requests_per_second']:.2f} 请求/秒")
+    print(f"延迟: p50 {latency['p50']:.1f} ms，p95 {latency['p95']:.1f} ms，"
+          f"p99 {latency['p99']:.1f} ms，最大 {latency['max']:.1f} ms")
+    print(f"状态码: {result['status_codes']}")
+
+
+if __name__ == "__main__":
+    main()
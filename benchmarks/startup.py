@@ -0,0 +1,63 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+# 在全新的解释器中导入模块，记录耗时以及被连带导入的重量级依赖
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+heavy = [m for m in ('torch', 'torchvision', 'PyQt6') if m in sys.modules]
+print(json.dumps({{'seconds': elapsed, 'heavy_modules': heavy}}))
+"""
+
+TARGETS = {
+    # 命令行的导入路径
+    'scan_cli': ['src.scan_cli'],
+    # 拆分前命令行导入时连带加载的依赖
+    'torch+torchvision+PyQt6': ['torch', 'torchvision', 'PyQt6.QtGui'],
+}
+
+
+def measure(modules, repeat):
+    samples, heavy = [], []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(modules=modules)],
+            cwd=project_root, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result['seconds'])
+        heavy = result['heavy_modules']
+    return {
+        'median_seconds': statistics.median(samples),
+        'min_seconds': min(samples),
+        'heavy_modules': heavy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量命令行的导入耗时')
+    parser.add_argument('-n', '--repeat', type=int, default=5, help='每项重复次数')
+    parser.add_argument('--json', action='store_true', help='输出 JSON')
+    args = parser.parse_args()
+
+    results = {name: measure(modules, args.repeat) for name, modules in TARGETS.items()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, result in results.items():
+        heavy = ', '.join(result['heavy_modules']) or '无'
+        print(f"{name}: 中位数 {result['median_seconds'] * 1000:.0f} ms，"
+              f"最小 {result['min_seconds'] * 1000:.0f} ms，重量级依赖: {heavy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,11 +25,18 @@ class DocumentController(QObject):
             self.processor = ImageProcessor()
             
         self.processor.load_image(file_path)
-        self.view.display_image(self.processor.image, self.view.original_image_label)
+        self.display_original()
         self.view.scan_btn.setEnabled(True)
+
+    def display_original(self):
+        """显示当前图像的预览：旋转只记录在处理器的视图中，不采样完整分辨率的图像，
+        扫描时旋转合进透视变换，从原图只采样一次"""
+        label = self.view.original_image_label
+        preview = self.processor.preview_image(max(label.width(), label.height()))
+        self.view.display_image(preview, label, self.processor.view.size)
         
     def handle_scan_request(self):
-        if self.processor is None or self.processor.image is None:
+        if self.processor is None or self.processor.view is None:
             self.view.show_warning("提示", "请先选择要扫描的图片！")
             return
             
@@ -44,7 +51,7 @@ class DocumentController(QObject):
         
     def handle_manual_corners(self, points):
         """处理手动选择的角点"""
-        if self.processor and self.processor.image is not None:
+        if self.processor and self.processor.view is not None:
             print("Original points:", points)
             points_array = np.array(points, dtype=np.float32)
             self.manual_corners = points_array
@@ -61,7 +68,7 @@ class DocumentController(QObject):
             )
             print(f"Target dimensions: {width} x {height}")
             
-            warped = self.processor.perspective_transform(self.processor.image, self.manual_corners)
+            warped = self.processor.perspective_transform(self.processor.view, self.manual_corners)
             if warped is not None:
                 print("Warped image shape:", warped.shape)
                 enhanced = enhance_image(warped)
@@ -77,9 +84,9 @@ class DocumentController(QObject):
         
     def handle_rotation(self, clockwise):
         """处理图像旋转"""
-        if self.processor and self.processor.image is not None:
-            rotated = self.processor.rotate_image(clockwise)
-            self.view.display_image(rotated, self.view.original_image_label)
+        if self.processor and self.processor.view is not None:
+            self.processor.rotate_image(clockwise)
+            self.display_original()
             # 清除已存储的手动角点，因为图片已旋转
             self.manual_corners = None
             
@@ -0,0 +1,175 @@
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+import cv2
+
+from .processor import ImageProcessor
+
+# 单张图像的处理结果
+# image 仅在未指定输出路径时返回，避免在进程间传输大数组
+# stats 为各阶段耗时记录（PageStats.to_dict()），仅在开启统计时返回
+BatchResult = namedtuple('BatchResult', ['index', 'input_path', 'output_path', 'image', 'elapsed', 'error', 'stats'],
+                         defaults=(None,))
+
+# 每个工作进程常驻的处理器
+_worker_processor = None
+
+
+def run_task(processor, index, input_path, output_path=None, collect_stats=False):
+    """使用给定处理器处理单张图像，异常记录在结果中而不是抛出
+    collect_stats 为 True 时记录各阶段（含写出）的耗时，随结果返回
+    """
+    start_time = time.perf_counter()
+    image, error = None, None
+    page_stats = processor.stats.start() if collect_stats else None
+    try:
+        result = processor.process_document(input_path)
+        if output_path:
+            with processor.stats.stage('imwrite'):
+                written = cv2.imwrite(output_path, result)
+            if not written:
+                raise ValueError(f"无法写入图像: {output_path}")
+        else:
+            image = result
+    except Exception as e:
+        error = str(e)
+    finally:
+        if collect_stats:
+            processor.stats.stop()
+    return BatchResult(index, input_path, output_path, image, time.perf_counter() - start_time, error,
+                       page_stats.to_dict() if page_stats is not None else None)
+
+
+def run_batch(processor, tasks, batch_size):
+    """按批次处理任务，每批图像的边界检测合并为一次前向推理
+    Args:
+        processor: 处理器
+        tasks: (index, input_path, output_path) 列表
+        batch_size: 每批图像数
+    Returns:
+        BatchResult 迭代器，耗时为所在批次的平均耗时
+    """
+    tasks = list(tasks)
+    for start in range(0, len(tasks), batch_size):
+        chunk = tasks[start:start + batch_size]
+        start_time = time.perf_counter()
+
+        images, errors = [], {}
+        for index, input_path, _ in chunk:
+            image = cv2.imread(input_path)
+            if image is None:
+                errors[index] = "Cannot load image"
+            else:
+                images.append((index, image))
+
+        outputs = {}
+        try:
+            results = processor.process_documents([image for _, image in images], batch_size)
+            for (index, _), result in zip(images, results):
+                if result is None:
+                    errors[index] = "Cannot detect document boundaries"
+                else:
+                    outputs[index] = result
+        except Exception as e:
+            errors.update((index, str(e)) for index, _ in images)
+        del images
+
+        finished = []
+        for index, input_path, output_path in chunk:
+            image, error = outputs.pop(index, None), errors.get(index)
+            if error is None and output_path:
+                if not cv2.imwrite(output_path, image):
+                    error = f"无法写入图像: {output_path}"
+                image = None
+            finished.append((index, input_path, output_path, image, error))
+
+        elapsed = (time.perf_counter() - start_time) / len(chunk)
+        for index, input_path, output_path, image, error in finished:
+            yield BatchResult(index, input_path, output_path, image, elapsed, error)
+
+
+def _init_worker(processor_factory, processor_kwargs, threads_per_worker):
+    """工作进程初始化：限制线程数并加载一次模型"""
+    global _worker_processor
+    if threads_per_worker:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+        cv2.setNumThreads(threads_per_worker)
+    _worker_processor = processor_factory(**processor_kwargs)
+    _worker_processor.preload_models()
+
+
+def _run_worker_task(task):
+    return run_task(_worker_processor, *task)
+
+
+class BatchEngine:
+    """多进程批量扫描引擎
+
+    每个工作进程持有一个常驻的 ImageProcessor，模型在进程启动时只加载一次；
+    任务逐个分发（chunksize=1），空闲进程立即领取下一张，使各核心负载均衡。
+
+    Args:
+        workers: 工作进程数，默认按 CPU 核心数 / 每进程线程数计算
+        threads_per_worker: 每个进程的 torch / OpenCV 线程数
+        processor_factory: 创建处理器的可序列化函数（模块级函数或类）
+        processor_kwargs: 传给 processor_factory 的参数
+        start_method: 进程启动方式，默认 spawn（fork 后使用 torch 可能死锁）
+    """
+
+    def __init__(self, workers=None, threads_per_worker=1, processor_factory=ImageProcessor,
+                 processor_kwargs=None, start_method='spawn'):
+        self.threads_per_worker = max(int(threads_per_worker or 1), 1)
+        self.workers = workers or max((os.cpu_count() or 1) // self.threads_per_worker, 1)
+        self.processor_factory = processor_factory
+        self.processor_kwargs = dict(processor_kwargs or {})
+        self.start_method = start_method
+        self._pool = None
+
+    def start(self):
+        """启动进程池"""
+        if self._pool is None:
+            context = multiprocessing.get_context(self.start_method)
+            self._pool = context.Pool(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(self.processor_factory, self.processor_kwargs, self.threads_per_worker),
+            )
+        return self
+
+    def close(self):
+        """关闭进程池并等待工作进程退出"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and self._pool is not None:
+            self._pool.terminate()
+        self.close()
+
+    def map(self, input_paths, output_paths=None, ordered=True, collect_stats=False):
+        """批量处理图像
+        Args:
+            input_paths: 输入图像路径列表
+            output_paths: 对应的输出路径列表，为None时结果图像随 BatchResult 返回
+            ordered: True 按输入顺序返回结果，False 按完成顺序返回
+            collect_stats: 是否记录每张图像各阶段的耗时
+        Returns:
+            BatchResult 迭代器
+        """
+        self.start()
+        input_paths = list(input_paths)
+        if output_paths is None:
+            output_paths = [None] * len(input_paths)
+        tasks = [(index, input_path, output_path, collect_stats)
+                 for index, (input_path, output_path) in enumerate(zip(input_paths, output_paths))]
+        if ordered:
+            return self._pool.imap(_run_worker_task, tasks, chunksize=1)
+        return self._pool.imap_unordered(_run_worker_task, tasks, chunksize=1)
@@ -356,7 +356,12 @@ class UVDocnet(nn.Module):
                 assert m.kernel_size[0] == m.kernel_size[1]
                 nn.init.xavier_normal_(m.weight, gain=0.2)
 
-    def forward(self, x):
+    def drop_3d_head(self):
+        """Remove the 3D point head, which inference does not use, and free its weights."""
+        self.out_point_positions3D = None
+        return self
+
+    def forward_features(self, x):
         resnet_head = self.resnet_head(x)
         resnet_down = self.resnet_down(resnet_head)
         bridge_1 = self.bridge_1(resnet_down)
@@ -367,8 +372,14 @@ class UVDocnet(nn.Module):
         bridge_6 = self.bridge_6(resnet_down)
         bridge_concat = torch.cat([bridge_1, bridge_2, bridge_3, bridge_4, bridge_5, bridge_6], dim=1)
         bridge = self.bridge_concat(bridge_concat)
+        return bridge
+
+    def forward(self, x):
+        bridge = self.forward_features(x)
 
         out_point_positions2D = self.out_point_positions2D(bridge)
+        if self.out_point_positions3D is None:
+            return (out_point_positions2D,)
         out_point_positions3D = self.out_point_positions3D(bridge)
 
         return out_point_positions2D, out_point_positions3D
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import warnings
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from .model import ResidualBlockWithDilation
+
+# 非 Sequential 模块中按属性名成对出现的 卷积 -> BN
+_FUSE_ATTRIBUTE_PAIRS = {
+    ResidualBlockWithDilation: (('conv1', 'bn1'), ('conv2', 'bn2')),
+}
+
+
+def _find_conv(module):
+    """返回卷积本身，或只包含一个卷积的 Sequential 中的卷积（及其所在容器和名字）"""
+    if isinstance(module, nn.Conv2d):
+        return None, None, module
+    if isinstance(module, nn.Sequential) and len(module) == 1 and isinstance(module[0], nn.Conv2d):
+        return module, '0', module[0]
+    return None, None, None
+
+
+def fuse_conv_bn(model):
+    """将 eval 模式下紧跟在卷积后的 BatchNorm 折叠进卷积的权重和偏置，BN 替换为 Identity
+    Args:
+        model: 处于 eval 模式的模型
+    Returns:
+        折叠的 卷积-BN 对数
+    """
+    fused = 0
+    for module in list(model.modules()):
+        if isinstance(module, nn.Sequential):
+            names = list(module._modules)
+            for conv_name, bn_name in zip(names, names[1:]):
+                conv, bn = module._modules[conv_name], module._modules[bn_name]
+                if isinstance(conv, nn.Conv2d) and isinstance(bn, nn.BatchNorm2d):
+                    module._modules[conv_name] = fuse_conv_bn_eval(conv, bn)
+                    module._modules[bn_name] = nn.Identity()
+                    fused += 1
+
+        for conv_attr, bn_attr in _FUSE_ATTRIBUTE_PAIRS.get(type(module), ()):
+            bn = getattr(module, bn_attr)
+            if not isinstance(bn, nn.BatchNorm2d):
+                continue
+            parent, name, conv = _find_conv(getattr(module, conv_attr))
+            if conv is None:
+                continue
+            fused_conv = fuse_conv_bn_eval(conv, bn)
+            if parent is None:
+                setattr(module, conv_attr, fused_conv)
+            else:
+                parent._modules[name] = fused_conv
+            setattr(module, bn_attr, nn.Identity())
+            fused += 1
+    return fused
+
+
+def remove_dropout(model):
+    """推理时 Dropout 不起作用，直接替换为 Identity"""
+    for module in list(model.modules()):
+        for name, child in module.named_children():
+            if isinstance(child, nn.modules.dropout._DropoutNd):
+                setattr(module, name, nn.Identity())
+
+
+def optimize_for_inference(model):
+    """推理前的模型简化：切换到 eval、折叠卷积-BN、移除 Dropout、关闭梯度
+    结果与原模型在浮点误差范围内一致，但不能再用于训练
+    """
+    model.eval()
+    fuse_conv_bn(model)
+    remove_dropout(model)
+    model.requires_grad_(False)
+    return model
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """计算文件的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compiled_model_path(weights_path, tag, device):
+    """编译产物的缓存路径：与权重文件同目录，按权重哈希、torch 版本和设备类型区分"""
+    torch_version = torch.__version__.replace('+', '_')
+    digest = file_digest(weights_path)[:16]
+    return f"{weights_path}.{tag}.{digest}.torch{torch_version}.{device.type}.ts"
+
+
+def load_compiled_model(weights_path, tag, build_model, device):
+    """加载 TorchScript 编译缓存，不存在时编译并写入缓存
+    Args:
+        weights_path: 权重文件路径
+        tag: 区分同一权重的不同模型变体（如是否折叠 BN）
+        build_model: 无参函数，返回已加载权重、位于 device 上的 eager 模型
+        device: 推理设备
+    Returns:
+        冻结后的 TorchScript 模型
+    """
+    cache_path = compiled_model_path(weights_path, tag, device)
+    # torch.jit 在新版本中标记为废弃，但仍是最快的离线编译方式
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        if os.path.exists(cache_path):
+            try:
+                return torch.jit.load(cache_path, map_location=device)
+            except Exception as e:
+                warnings.warn(f"编译缓存损坏，重新编译: {cache_path} ({e})")
+
+        model = build_model().eval()
+        compiled = torch.jit.freeze(torch.jit.script(model))
+        try:
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            torch.jit.save(compiled, tmp_path)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            warnings.warn(f"无法写入编译缓存: {cache_path} ({e})")
+        return compiled
@@ -0,0 +1,220 @@
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from .batch import BatchResult
+
+# 阶段结束标记
+_DONE = object()
+
+
+class _Job:
+    """流水线中的一张图像"""
+    __slots__ = ('index', 'input_path', 'output_path', 'image', 'detection', 'result', 'error', 'start')
+
+    def __init__(self, index, input_path, output_path):
+        self.index = index
+        self.input_path = input_path
+        self.output_path = output_path
+        self.image = None
+        self.detection = None
+        self.result = None
+        self.error = None
+        self.start = None
+
+
+class ScanPipeline:
+    """流水线批量扫描
+
+    解码、批量推理、透视变换+二值化、编码写出分成四个阶段，阶段之间用有界队列连接：
+    磁盘 I/O 与计算重叠进行，同时在途的图像数量受队列长度限制，内存占用有上界。
+    OpenCV 的函数在执行时会释放 GIL，因此解码、后处理和编码阶段使用线程即可并行。
+    处理器开启 reduced_decode 时，解码阶段只做降采样解码供边界检测，
+    完整分辨率的解码移到后处理阶段，队列中等待的图像占用的内存随之减小。
+
+    Args:
+        processor: 已配置的 ImageProcessor
+        decode_threads: 解码线程数
+        postprocess_threads: 透视变换与二值化线程数，默认为 CPU 核心数
+        encode_threads: 编码写出线程数
+        batch_size: 推理阶段每批最多的图像数
+        batch_timeout: 推理阶段凑批时等待后续图像的最长秒数
+        queue_size: 每个阶段队列的容量
+    """
+
+    def __init__(self, processor, decode_threads=2, postprocess_threads=None, encode_threads=2,
+                 batch_size=8, batch_timeout=0.05, queue_size=8):
+        self.processor = processor
+        self.decode_threads = max(decode_threads, 1)
+        self.postprocess_threads = max(postprocess_threads or os.cpu_count() or 1, 1)
+        self.encode_threads = max(encode_threads, 1)
+        self.batch_size = max(batch_size, 1)
+        self.batch_timeout = batch_timeout
+        self.queue_size = max(queue_size, 1)
+
+    def run(self, input_paths, output_paths=None):
+        """处理图像，按完成顺序返回 BatchResult 迭代器
+        Args:
+            input_paths: 输入图像路径列表
+            output_paths: 对应的输出路径列表，为None时结果图像随 BatchResult 返回
+        """
+        input_paths = list(input_paths)
+        if output_paths is None:
+            output_paths = [None] * len(input_paths)
+
+        tasks = queue.Queue()
+        decoded = queue.Queue(self.queue_size)
+        detected = queue.Queue(self.queue_size)
+        processed = queue.Queue(self.queue_size)
+        results = queue.Queue()
+
+        for index, (input_path, output_path) in enumerate(zip(input_paths, output_paths)):
+            tasks.put(_Job(index, input_path, output_path))
+        for _ in range(self.decode_threads):
+            tasks.put(_DONE)
+
+        postprocess_finished = _Countdown(self.postprocess_threads)
+        threads = (
+            [self._spawn(self._decode_worker, tasks, decoded, results) for _ in range(self.decode_threads)]
+            + [self._spawn(self._inference_worker, decoded, detected, results)]
+            + [self._spawn(self._postprocess_worker, detected, processed, results, postprocess_finished)
+               for _ in range(self.postprocess_threads)]
+            + [self._spawn(self._encode_worker, processed, results) for _ in range(self.encode_threads)]
+        )
+
+        for _ in range(len(input_paths)):
+            job = results.get()
+            elapsed = time.perf_counter() - job.start
+            yield BatchResult(job.index, job.input_path, job.output_path, job.result, elapsed, job.error)
+        # 提前停止迭代时各线程可能阻塞在有界队列上，它们是守护线程，不在此等待
+        for thread in threads:
+            thread.join()
+
+    @property
+    def _reduced_decode(self):
+        return self.processor.reduced_decode and not self.processor.enable_unwarp
+
+    @staticmethod
+    def _spawn(target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    def _decode_worker(self, tasks, decoded, results):
+        """解码阶段：读取图像"""
+        while True:
+            job = tasks.get()
+            if job is _DONE:
+                decoded.put(_DONE)
+                return
+            job.start = time.perf_counter()
+            if self._reduced_decode:
+                job.image = self.processor.load_detection_image(job.input_path)
+            else:
+                job.image = cv2.imread(job.input_path)
+            if job.image is None:
+                job.error = "Cannot load image"
+                results.put(job)
+            else:
+                decoded.put(job)
+
+    def _next_batch(self, decoded, pending_done):
+        """从解码队列凑一批图像，返回 (批次, 已收到的结束标记数)"""
+        batch = []
+        while pending_done < self.decode_threads and len(batch) < self.batch_size:
+            try:
+                # 批次为空时一直等待，否则最多等待 batch_timeout
+                job = decoded.get(timeout=self.batch_timeout if batch else None)
+            except queue.Empty:
+                break
+            if job is _DONE:
+                pending_done += 1
+            else:
+                batch.append(job)
+        return batch, pending_done
+
+    def _inference_worker(self, decoded, detected, results):
+        """推理阶段：批量边界检测或扭曲矫正"""
+        done = 0
+        while done < self.decode_threads:
+            batch, done = self._next_batch(decoded, done)
+            if not batch:
+                continue
+            images = [job.image for job in batch]
+            try:
+                if self.processor.enable_unwarp:
+                    outputs = self.processor.unwarp_documents(images, self.batch_size)
+                else:
+                    outputs = self.processor.detect_documents(images, self.batch_size)
+            except Exception as e:
+                for job in batch:
+                    job.error, job.image = str(e), None
+                    results.put(job)
+                continue
+            for job, output in zip(batch, outputs):
+                if output is None:
+                    job.error, job.image = "Cannot detect document boundaries", None
+                    results.put(job)
+                else:
+                    job.detection = output
+                    detected.put(job)
+        for _ in range(self.postprocess_threads):
+            detected.put(_DONE)
+
+    def _postprocess_worker(self, detected, processed, results, finished):
+        """后处理阶段：透视变换与二值化"""
+        while True:
+            job = detected.get()
+            if job is _DONE:
+                # 最后一个退出的后处理线程通知所有编码线程结束
+                if finished.release():
+                    for _ in range(self.encode_threads):
+                        processed.put(_DONE)
+                return
+            try:
+                if self.processor.enable_unwarp:
+                    job.result = self.processor.binarize(job.detection)
+                else:
+                    image, corners = job.image, job.detection
+                    if self._reduced_decode:
+                        image = cv2.imread(job.input_path)
+                        if image is None:
+                            raise ValueError("Cannot load image")
+                        corners = self.processor.scale_corners(corners, job.image.shape, image.shape)
+                    transformed = self.processor.perspective_transform(image, corners)
+                    job.result = self.processor.binarize(transformed)
+            except Exception as e:
+                job.error = str(e)
+            job.image = job.detection = None
+            if job.error is None:
+                processed.put(job)
+            else:
+                results.put(job)
+
+    def _encode_worker(self, processed, results):
+        """编码阶段：写出结果"""
+        while True:
+            job = processed.get()
+            if job is _DONE:
+                return
+            if job.output_path:
+                if not cv2.imwrite(job.output_path, job.result):
+                    job.error = f"无法写入图像: {job.output_path}"
+                job.result = None
+            results.put(job)
+
+
+class _Countdown:
+    """线程安全的倒计数，release 在计数归零时返回 True"""
+
+    def __init__(self, count):
+        self._count = count
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            self._count -= 1
+            return self._count == 0
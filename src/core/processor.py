@@ -1,30 +1,116 @@
 import cv2
 import numpy as np
-import torch
-from torchvision import transforms
-from torchvision.models.segmentation import deeplabv3_mobilenet_v3_large, deeplabv3_resnet50
+import glob
 import os
-from .utils import bilinear_unwarping, load_model  # Add these imports
+from concurrent.futures import ThreadPoolExecutor
+from .utils import (bilinear_unwarping, bilinear_unwarping_bands, jpeg_size, load_model,  # Add these imports
+                    remap_unwarping)
+from .profiling import StageRecorder
+from .view import ImageView
+
+# torch / torchvision 及依赖它们的模块在第一次用到模型时才导入，
+# 透视变换、二值化等纯 OpenCV 路径不需要承担其导入开销
 
 class ImageProcessor:
     DEFAULT_MODEL_PATH = 'weights/image_trimming_enhancement/model_mbv3_iou_mix_2C049.pth'
     UNWARP_MODEL_PATH = 'weights/best_model.pkl'  # Add default path for unwarp model
+    SEGMENTATION_SIZE = 384  # 分割模型默认输入尺寸（训练时的尺寸）
+    SEGMENTATION_SIZES = (192, 256, 320, 384, 512)  # 可选的分割输入尺寸
+    SEGMENTATION_CASCADE = (256, 384)  # segmentation_size = 'auto' 时依次尝试的尺寸
+    QUAD_MIN_AREA = 0.1  # 自动选择分辨率时，四边形面积至少占图像面积的比例
+    QUAD_METHODS = ('lean', 'legacy')  # 掩码提取角点的方法，两者结果相同
+    QUAD_PADDING = 4  # lean 方法的掩码补边：Canny 边缘外扩 1 像素 + 膨胀半径 2 + findContours 忽略的 1 像素边框
+    DETECT_BATCH_SIZE = 8  # 批量检测时每次前向推理的图像数
+    UNWARP_INPUT_SIZE = (488, 712)  # 扭曲矫正模型输入尺寸 (宽, 高)
+    UNWARP_BATCH_SIZE = 4  # 批量矫正时每次前向推理的图像数
+    UNWARP_BACKENDS = ('torch', 'remap')  # 扭曲矫正重采样后端
+    REMAP_MEMORY_BUDGET = 64 * 2 ** 20  # remap 后端未设置内存上限时每块的临时内存
+    SHADOW_METHODS = ('gaussian', 'pyramid')  # 阴影去除的光照估计方法
+    PYRAMID_MIN_SIGMA = 4.0  # 金字塔光照估计在最低一层上保留的最小模糊 σ（像素）
+    BINARIZE_ENGINES = ('adaptive', 'sauvola', 'niblack')  # 局部阈值二值化方法
+    SAUVOLA_K = 0.2  # Sauvola 阈值 T = m * (1 + k * (s / R - 1))
+    SAUVOLA_R = 128.0
+    NIBLACK_K = -0.2  # Niblack 阈值 T = m + k * s - C，C 与 adaptiveThreshold 的常数相同
+    NIBLACK_C = 20
+    INTEGRAL_BAND_ROWS = 256  # 积分图阈值每次处理的行数，限制临时内存
+    # 透视变换可选的插值方法，输出只用于二值化时 linear / cubic 已足够
+    WARP_INTERPOLATIONS = {'nearest': cv2.INTER_NEAREST, 'linear': cv2.INTER_LINEAR,
+                           'cubic': cv2.INTER_CUBIC, 'lanczos4': cv2.INTER_LANCZOS4}
+    # 输出页面规格（毫米，短边 x 长边），与 output_dpi 一起决定输出尺寸
+    PAGE_SIZES_MM = {'a4': (210, 297), 'a5': (148, 210), 'letter': (215.9, 279.4), 'legal': (215.9, 355.6)}
+    BINARIZE_MIN_STRIP_ROWS = 256  # 并行二值化时每个条带的最少行数，页面太矮时退回整页处理
+    CALIBRATION_DIR = 'examples'  # int8 量化默认校准图像目录
+    CALIBRATION_LIMIT = 16  # int8 量化最多使用的校准图像数
+    # JPEG 降采样解码的比例，从大到小尝试
+    REDUCED_DECODE_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                            (2, cv2.IMREAD_REDUCED_COLOR_2))
     
     def __init__(self, model_path=None):
-        self.image = None
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.view = None  # 当前图像及记录下来的旋转、裁剪、缩放，见 image
+        self._device = None  # 第一次访问 device 时确定
         self.model = None
         self.model_path = model_path or self.DEFAULT_MODEL_PATH
-        self.transformer = transforms.Compose([
-            transforms.ToTensor(),
-            transforms.Normalize(mean=(0.4611, 0.4359, 0.3905), 
-                               std=(0.2193, 0.2150, 0.2109))
-        ])
+        self._transformer = None
         self.remove_shadow = False  # 添加阴影处理开关
         self.enable_unwarp = False  # 添加扭曲矫正开关
         self.unwarp_model = None
         self.unwarp_model_path = self.UNWARP_MODEL_PATH
+        self.optimize_models = True  # 加载模型时做推理优化（折叠卷积-BN 等）
+        self.use_compiled_cache = False  # 使用权重旁的 TorchScript 编译缓存
+        self.int8 = False  # int8 量化推理（仅 CPU）
+        self.calibration_images = None  # int8 校准图像路径，None 时使用 CALIBRATION_DIR
+        self.reduced_decode = False  # 从文件处理时，边界检测使用降采样解码的图像
+        self.unwarp_memory_budget = None  # 扭曲矫正分块重采样的临时内存上限（字节），None 时整图一次完成
+        self.unwarp_backend = 'torch'  # 'torch'：float grid_sample；'remap'：OpenCV 定点 remap，直接处理 uint8
+        # 分割输入尺寸，见 SEGMENTATION_SIZES；'auto'：先用低分辨率，角点不可靠的图像再换更高分辨率
+        self.segmentation_size = self.SEGMENTATION_SIZE
+        self.quad_method = 'lean'  # 'lean'：在补少量边的 uint8 掩码上只找外轮廓；'legacy'：原来的 int32 大画布 + 全部轮廓
+        self.shadow_method = 'gaussian'  # 'gaussian'：整图大核高斯模糊；'pyramid'：在金字塔低分辨率层上模糊后放大
+        self.binarize_engine = 'adaptive'  # 'adaptive'：高斯加权 adaptiveThreshold；'sauvola' / 'niblack'：积分图均值方差阈值
+        self.binarize_threads = 1  # 大于 1 时把页面分成水平条带在线程池中二值化，结果与整页处理相同
+        self.mono_warp = False  # 先取亮度（LAB 的 L）再只对单通道做透视变换，输出灰度图供二值化
+        self.warp_interpolation = 'lanczos4'  # 透视变换的插值方法，见 WARP_INTERPOLATIONS
+        # 输出尺寸，都为 None 时按角点边长（扭曲矫正时按输入尺寸）输出，见 output_size_for
+        self.output_size = None  # 固定输出尺寸 (宽, 高)
+        self.output_dpi = None  # 目标 DPI，按 output_page 的纸张大小和页面方向计算尺寸
+        self.output_page = 'a4'
+        self.output_max_size = None  # 输出长边上限（像素），只缩小不放大
+        self.copy_padding = False  # 角点超出图像时复制一张补零扩展的整图（旧方法）；默认把平移合进单应矩阵，不复制
+        self.stats = StageRecorder()  # 各处理阶段的耗时记录，process_document(return_stats=True) 时开启
         
+    @property
+    def image(self):
+        """当前图像。旋转、裁剪、缩放只记录在 view 中，访问时才一次性采样（结果会缓存）"""
+        return None if self.view is None else self.view.materialize()
+
+    @image.setter
+    def image(self, image):
+        self.view = None if image is None else ImageView(image)
+
+    @property
+    def device(self):
+        """推理设备，有 CUDA 时使用 GPU"""
+        if self._device is None:
+            import torch
+            self._device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        return self._device
+
+    @device.setter
+    def device(self, device):
+        self._device = device
+
+    @property
+    def transformer(self):
+        """分割模型的输入预处理"""
+        if self._transformer is None:
+            from torchvision import transforms
+            self._transformer = transforms.Compose([
+                transforms.ToTensor(),
+                transforms.Normalize(mean=(0.4611, 0.4359, 0.3905), 
+                                   std=(0.2193, 0.2150, 0.2109))
+            ])
+        return self._transformer
+
     def _ensure_model_loaded(self):
         """确保模型已加载"""
         if self.model is None and os.path.exists(self.model_path):
@@ -33,29 +119,121 @@ class ImageProcessor:
     def _ensure_unwarp_model_loaded(self):
         """Ensure unwarp model is loaded"""
         if self.unwarp_model is None and os.path.exists(self.unwarp_model_path):
-            self.unwarp_model = load_model(self.unwarp_model_path)
-            self.unwarp_model.to(self.device)
-            self.unwarp_model.eval()
+            if self.use_compiled_cache and not self.int8:
+                from .optimize import load_compiled_model
+                tag = f"uvdoc2d-{'fused' if self.optimize_models else 'plain'}"
+                self.unwarp_model = load_compiled_model(
+                    self.unwarp_model_path, tag, self._build_unwarp_model, self.device)
+            else:
+                self.unwarp_model = self._build_unwarp_model()
+
+    def _build_unwarp_model(self):
+        """Build the unwarp model and load its weights"""
+        # 推理只用到 2D 网格，不加载 3D 输出头
+        model = load_model(self.unwarp_model_path, with_3d_head=False)
+        model.to(self.device)
+        model.eval()
+        if self.optimize_models:
+            from .optimize import optimize_for_inference
+            optimize_for_inference(model)
+        if self.int8:
+            from .quantize import quantize_model
+            model = quantize_model(model, [
+                self._prepare_unwarp_input(self._to_float_rgb(image))
+                for image in self._load_calibration_images()
+            ])
+        return model
+
+    def _load_calibration_images(self):
+        """读取 int8 量化的校准图像"""
+        paths = self.calibration_images
+        if paths is None:
+            paths = sorted(p for ext in ('*.jpg', '*.jpeg', '*.png')
+                           for p in glob.glob(os.path.join(self.CALIBRATION_DIR, ext)))
+        images = []
+        for path in paths[:self.CALIBRATION_LIMIT]:
+            image = cv2.imread(path)
+            if image is not None:
+                images.append(image)
+        if not images:
+            raise ValueError("找不到 int8 量化的校准图像")
+        return images
+
+    def preload_models(self):
+        """按当前设置预先加载所需模型，批量处理时只需加载一次"""
+        if self.enable_unwarp:
+            self._ensure_unwarp_model_loaded()
+        else:
+            self._ensure_model_loaded()
 
     def load_image(self, image_path):
         """加载图像"""
         self.image = cv2.imread(image_path)
         return self.image
         
+    def load_detection_image(self, image_path):
+        """读取用于边界检测的图像
+        JPEG 在解码时直接缩小（DCT 域缩放，比完整解码快且省内存），选择短边仍不小于
+        分割输入尺寸（自动选择时为其中最大的）的最大缩小比例；其他格式或较小的图像按原尺寸解码。
+        得到的角点需用 scale_corners 换算到完整图像上。
+        """
+        flag = cv2.IMREAD_COLOR
+        size = jpeg_size(image_path)
+        if size is not None:
+            segmentation_size = max(self._segmentation_sizes())
+            for factor, reduced_flag in self.REDUCED_DECODE_FLAGS:
+                if min(size) // factor >= segmentation_size:
+                    flag = reduced_flag
+                    break
+        return cv2.imread(image_path, flag)
+
+    @staticmethod
+    def scale_corners(corners, from_shape, to_shape):
+        """把角点从一幅图像的坐标换算到另一尺寸的同一幅图像上（按实际宽高比例）"""
+        corners = corners.astype(np.float32)
+        corners[:, 0] *= to_shape[1] / from_shape[1]
+        corners[:, 1] *= to_shape[0] / from_shape[0]
+        return corners
+
     def load_model(self, model_path, num_classes=2, model_name="mbv3"):
         """加载深度学习模型"""
+        build_model = lambda: self._build_model(model_path, num_classes, model_name)
+        if self.use_compiled_cache and not self.int8:
+            from .optimize import load_compiled_model
+            tag = f"{model_name}-{'fused' if self.optimize_models else 'plain'}"
+            self.model = load_compiled_model(model_path, tag, build_model, self.device)
+        else:
+            self.model = build_model()
+
+    def _build_model(self, model_path, num_classes=2, model_name="mbv3"):
+        """构建分割模型并加载权重"""
+        import torch
+        from torchvision.models.segmentation import deeplabv3_mobilenet_v3_large, deeplabv3_resnet50
+
+        # 权重文件包含完整模型，不需要下载 ImageNet 预训练骨干
         if model_name == "mbv3":
-            self.model = deeplabv3_mobilenet_v3_large(num_classes=num_classes)
+            model = deeplabv3_mobilenet_v3_large(num_classes=num_classes, weights_backbone=None)
         else:
-            self.model = deeplabv3_resnet50(num_classes=num_classes)
+            model = deeplabv3_resnet50(num_classes=num_classes, weights_backbone=None)
         
         # 先将模型移到指定设备
-        self.model.to(self.device)
+        model.to(self.device)
         
         # 加载权重并确保它们在正确的设备上
         checkpoints = torch.load(model_path, map_location=self.device)
-        self.model.load_state_dict(checkpoints, strict=False)
-        self.model.eval()
+        model.load_state_dict(checkpoints, strict=False)
+        model.eval()
+        if self.optimize_models:
+            # 折叠卷积-BN 等推理期简化
+            from .optimize import optimize_for_inference
+            optimize_for_inference(model)
+        if self.int8:
+            from .quantize import quantize_model
+            model = quantize_model(model, [
+                self._prepare_detection_input(image).unsqueeze(0)
+                for image in self._load_calibration_images()
+            ])
+        return model
 
     def detect_document(self, image=None):
         """使用深度学习模型检测文档边界"""
@@ -67,30 +245,169 @@ class ImageProcessor:
         if self.model is None:
             raise ValueError("无法加载模型")
 
-        IMAGE_SIZE = 384
+        return self.detect_documents([image])[0]
+
+    def detect_documents(self, images, batch_size=None):
+        """批量检测文档边界，多张图像合并为一个批次做一次前向推理
+        Args:
+            images: 图像列表
+            batch_size: 每次前向推理的最大图像数，为None时使用 DETECT_BATCH_SIZE
+        Returns:
+            与输入对应的角点列表，未检测到边界的图像为 None
+        """
+        self._ensure_model_loaded()  # 只在需要时才加载模型
+
+        if self.model is None:
+            raise ValueError("无法加载模型")
+
+        sizes = self._segmentation_sizes()
+        results = [None] * len(images)
+        pending = list(range(len(images)))
+        for level, size in enumerate(sizes):
+            detected = self._detect_at_size([images[index] for index in pending], size,
+                                            batch_size or self.DETECT_BATCH_SIZE)
+            retry = []
+            for index, corners in zip(pending, detected):
+                results[index] = corners
+                # 最后一级的结果直接使用，前面各级只有可靠的四边形才接受
+                if level + 1 < len(sizes) and not self._is_good_quad(corners, images[index].shape[:2]):
+                    retry.append(index)
+            pending = retry
+            if not pending:
+                break
+        return results
+
+    def _segmentation_sizes(self):
+        """本次检测依次尝试的分割输入尺寸"""
+        if self.segmentation_size == 'auto':
+            return self.SEGMENTATION_CASCADE
+        if self.segmentation_size not in self.SEGMENTATION_SIZES:
+            raise ValueError(f"不支持的分割输入尺寸: {self.segmentation_size}")
+        return (self.segmentation_size,)
+
+    def _is_good_quad(self, corners, image_shape):
+        """角点是否构成可信的文档边界：四个顶点、凸四边形、面积不太小"""
+        if corners is None or len(corners) != 4:
+            return False
+        if not cv2.isContourConvex(corners):
+            return False
+        return cv2.contourArea(corners) >= self.QUAD_MIN_AREA * image_shape[0] * image_shape[1]
+
+    def _detect_at_size(self, images, size, batch_size):
+        """以 size x size 的分割输入批量检测，返回与输入对应的角点列表"""
+        import torch
+        results = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+
+            with self.stats.stage('segmentation_preprocess') as stage:
+                # 预处理图像并堆叠成一个批次
+                batch = torch.stack([self._prepare_detection_input(image, size) for image in chunk])
+                # 将输入数据移动到与模型相同的设备上
+                batch = batch.to(self.device)
+                stage.output = batch
+
+            with self.stats.stage('segmentation_forward') as stage:
+                # 模型推理
+                with torch.no_grad():
+                    out = self.model(batch)["out"]
+
+                # 在设备上取 argmax，只把 uint8 掩码拷回 CPU
+                masks = torch.argmax(out, dim=1).to(torch.uint8).cpu().numpy()
+                stage.output = masks
+
+            with self.stats.stage('contour_extraction') as stage:
+                for image, mask in zip(chunk, masks):
+                    results.append(self._mask_to_corners(mask, self._detection_extent(image.shape, size)))
+                stage.output = results[start:]
+
+        return results
+
+    def _prepare_detection_input(self, image, size=None):
+        """调整图像大小并归一化为模型输入，size 为None时使用 SEGMENTATION_SIZE
+        开启 reduced_decode 时按面积平均缩小：先按 REDUCED_DECODE_FLAGS 中的整数比例做块平均
+        （与 JPEG 降采样解码相当，也走 INTER_AREA 的快速路径），再 INTER_AREA 缩小到输入尺寸，
+        完整解码的图像（非 JPEG）与降采样解码的图像得到几乎相同的模型输入
+        """
+        size = size or self.SEGMENTATION_SIZE
+        if not self.reduced_decode:
+            image_resize = cv2.resize(image, (size, size), interpolation=cv2.INTER_NEAREST)
+            return self.transformer(image_resize)
+        factor = self._block_factor(image.shape, size)
+        if factor > 1:
+            height, width = self._detection_extent(image.shape, size)
+            image = cv2.resize(image[:height, :width], (width // factor, height // factor),
+                               interpolation=cv2.INTER_AREA)
+        image_resize = cv2.resize(image, (size, size), interpolation=cv2.INTER_AREA)
+        return self.transformer(image_resize)
+
+    def _block_factor(self, shape, size):
+        """块平均的整数比例：短边仍不小于 size 的最大比例，与 load_detection_image 的选择相同"""
+        for factor, _ in self.REDUCED_DECODE_FLAGS:
+            if min(shape[:2]) // factor >= size:
+                return factor
+        return 1
+
+    def _detection_extent(self, shape, size):
+        """分割输入覆盖的原图区域 (高, 宽)，角点按它换算回原图坐标
+        块平均前裁掉右 / 下边缘不足一块的像素，区域左上角仍是原点，换算后就是原图坐标
+        """
+        height, width = shape[:2]
+        if not self.reduced_decode:
+            return height, width
+        factor = self._block_factor(shape, size)
+        return height // factor * factor, width // factor * factor
+
+    def _mask_to_corners(self, mask, image_shape):
+        """从分割掩码中提取文档角点（原图坐标）
+        Args:
+            mask: 分割掩码，文档区域为 1
+            image_shape: 原图的 (高, 宽)
+        Returns:
+            角点数组，没有找到轮廓时为 None
+        """
+        if self.quad_method not in self.QUAD_METHODS:
+            raise ValueError(f"未知的角点提取方法: {self.quad_method}")
+        if self.quad_method == 'legacy':
+            return self._mask_to_corners_legacy(mask, image_shape)
+
+        pad = self.QUAD_PADDING
+        mask_h, mask_w = mask.shape
+        imH, imW = image_shape
+
+        # 补边后的 uint8 掩码只有几个像素宽的零边，Canny 与膨胀的结果和大画布上相同
+        out = cv2.copyMakeBorder(mask.astype(np.uint8, copy=False), pad, pad, pad, pad,
+                                 cv2.BORDER_CONSTANT, value=0)
+        out *= 255
+        canny = cv2.Canny(out, 225, 255)
+        canny = cv2.dilate(canny, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5)))
+
+        # 面积最大的轮廓一定是某个外轮廓，内轮廓（边缘环的内侧）不用找
+        contours, _ = cv2.findContours(canny, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+
+        page = max(contours, key=cv2.contourArea)
+        epsilon = 0.02 * cv2.arcLength(page, True)
+        corners = cv2.approxPolyDP(page, epsilon, True)
+
+        corners = np.concatenate(corners).astype(np.float32)
+        corners -= pad
+        corners[:, 0] *= imW / mask_w
+        corners[:, 1] *= imH / mask_h
+        return corners
+
+    def _mask_to_corners_legacy(self, mask, image_shape):
+        """从分割掩码中提取文档角点（原来的方法，保留用于对比）"""
+        IMAGE_SIZE = mask.shape[0]  # 正方形掩码的边长，即分割输入尺寸
         half = IMAGE_SIZE // 2
-        imH, imW, C = image.shape
-        
-        # 调整图像大小
-        image_resize = cv2.resize(image, (IMAGE_SIZE, IMAGE_SIZE), 
-                                interpolation=cv2.INTER_NEAREST)
-        
+        imH, imW = image_shape
+
         scale_x = imW / IMAGE_SIZE
         scale_y = imH / IMAGE_SIZE
 
-        # 预处理图像
-        image_transformer = self.transformer(image_resize)
-        image_transformer = torch.unsqueeze(image_transformer, dim=0)
-        # 将输入数据移动到与模型相同的设备上
-        image_transformer = image_transformer.to(self.device)
-
-        # 模型推理
-        with torch.no_grad():
-            out = self.model(image_transformer)["out"].cpu()
-
         # 后处理
-        out = torch.argmax(out, dim=1, keepdims=True).permute(0, 2, 3, 1)[0].numpy()
-        out = out.squeeze().astype(np.int32)
+        out = mask.astype(np.int32)
 
         r_H, r_W = out.shape
         _out_extended = np.zeros((IMAGE_SIZE + r_H, IMAGE_SIZE + r_W), dtype=out.dtype)
@@ -119,8 +436,53 @@ class ImageProcessor:
         
         return corners
 
-    def perspective_transform(self, image, corners):
-        """改进的透视变换方法"""
+    def output_size_for(self, width, height):
+        """按输出尺寸设置计算页面的目标尺寸
+        Args:
+            width, height: 页面的原始尺寸（角点边长或扭曲矫正的输入尺寸）
+        Returns:
+            (宽, 高)，没有设置时返回原始尺寸
+        """
+        if self.output_size is not None:
+            width, height = self.output_size
+            return int(width), int(height)
+        if self.output_dpi:
+            if self.output_page not in self.PAGE_SIZES_MM:
+                raise ValueError(f"未知的页面规格: {self.output_page}")
+            short_side, long_side = (int(round(mm / 25.4 * self.output_dpi))
+                                     for mm in self.PAGE_SIZES_MM[self.output_page])
+            # 页面方向跟随原始尺寸
+            width, height = (long_side, short_side) if width > height else (short_side, long_side)
+        if self.output_max_size and max(width, height) > self.output_max_size:
+            scale = self.output_max_size / max(width, height)
+            width, height = max(int(round(width * scale)), 1), max(int(round(height * scale)), 1)
+        return width, height
+
+    def perspective_transform(self, image, corners, mono=None):
+        """改进的透视变换方法
+        Args:
+            image: 输入图像，或 ImageView（此时角点为视图坐标，视图的变换合进单应矩阵，直接从原图采样）
+            corners: 文档四个角点
+            mono: 是否只变换亮度通道并返回灰度图，如果为None则使用实例默认设置
+        """
+        if mono is None:
+            mono = self.mono_warp
+        source_matrix = None
+        if isinstance(image, ImageView):
+            # 已经采样过的视图直接使用：按行读取比经过旋转的原图更利于缓存。
+            # 未采样的视图合进单应矩阵：变换本身约慢 8%，但省去整图旋转一次，端到端不比先旋转慢，峰值内存更低
+            if image.is_identity or image.is_materialized or self.copy_padding:
+                image = image.materialize()
+            else:
+                view_size, source_matrix, image = image.size, image.matrix, image.source
+        if self.warp_interpolation not in self.WARP_INTERPOLATIONS:
+            raise ValueError(f"未知的插值方法: {self.warp_interpolation}")
+        if mono:
+            # 二值化只用 L 通道，在原图上取一次亮度，之后的扩展和变换都只处理一个通道
+            with self.stats.stage('grayscale') as stage:
+                image = self._luma(image)
+                stage.output = image
+
         def order_points(pts):
             rect = np.zeros((4, 2), dtype='float32')
             pts = np.array(pts)
@@ -144,49 +506,99 @@ class ImageProcessor:
                                  [maxWidth, maxHeight], [0, maxHeight]]
             return order_points(np.array(destination_corners))
 
+        # 缩小到原始尺寸的一半及以下时，先用 pyrDown 对原图抗混叠降采样，再从该层一次变换到目标尺寸。
+        # pyrDown 第 L 层的像素 j 对应原图像素 2^L * j。层数在扩展边界之前确定，
+        # 两条越界处理路径都在未扩展的图像上建金字塔，扩展量取 2^L 的倍数，采样网格对齐
+        levels = 0
+        natural_size = tuple(int(v) for v in find_dest(order_points(corners))[2])
+        if natural_size[0] * natural_size[1] > 0:
+            width, height = self.output_size_for(*natural_size)
+            scale = np.sqrt(width * height / (natural_size[0] * natural_size[1]))
+            if source_matrix is not None:
+                scale *= np.sqrt(abs(np.linalg.det(source_matrix[:2, :2])))
+            while scale * 2 ** (levels + 1) <= 1 and min(image.shape[:2]) >= 2 ** (levels + 1):
+                levels += 1
+        step = 2 ** levels
+
         # 处理边界超出图像的情况
-        imH, imW = image.shape[:2]
+        imW, imH = view_size if source_matrix is not None else (image.shape[1], image.shape[0])
         BUFFER = 10
+        offset = None
+        pyramid_built = False
         
-        if not (np.all(corners.min(axis=0) >= (0, 0)) and 
+        if not (np.all(corners.min(axis=0) >= (0, 0)) and
                 np.all(corners.max(axis=0) <= (imW, imH))):
-            left_pad, top_pad, right_pad, bottom_pad = 0, 0, 0, 0
-            rect = cv2.minAreaRect(corners.reshape((-1, 1, 2)))
-            box = cv2.boxPoints(rect)
-            box_corners = np.int32(box)
-
-            # 计算需要的填充
-            box_x_min, box_x_max = np.min(box_corners[:, 0]), np.max(box_corners[:, 0])
-            box_y_min, box_y_max = np.min(box_corners[:, 1]), np.max(box_corners[:, 1])
-
-            if box_x_min <= 0: left_pad = abs(box_x_min) + BUFFER
-            if box_x_max >= imW: right_pad = (box_x_max - imW) + BUFFER
-            if box_y_min <= 0: top_pad = abs(box_y_min) + BUFFER
-            if box_y_max >= imH: bottom_pad = (box_y_max - imH) + BUFFER
-
-            # 扩展图像
-            image_extended = np.zeros((top_pad + bottom_pad + imH, 
-                                     left_pad + right_pad + imW, 3), 
-                                    dtype=image.dtype)
-            image_extended[top_pad:top_pad + imH, 
-                          left_pad:left_pad + imW] = image
-            
-            # 调整角点位置
-            corners[:, 0] += left_pad
-            corners[:, 1] += top_pad
-            image = image_extended
-
-        # 执行透视变换
-        corners = order_points(corners)
-        destination_corners = find_dest(corners)
-        M = cv2.getPerspectiveTransform(corners, destination_corners)
-        
-        warped = cv2.warpPerspective(image, M, 
-                                    (int(destination_corners[2][0]), 
-                                     int(destination_corners[2][1])),
-                                    flags=cv2.INTER_LANCZOS4)
-        
-        warped = np.clip(warped, 0, 255).astype(np.uint8)
+            with self.stats.stage('border_padding') as stage:
+                left_pad, top_pad, right_pad, bottom_pad = 0, 0, 0, 0
+                rect = cv2.minAreaRect(corners.reshape((-1, 1, 2)))
+                box = cv2.boxPoints(rect)
+                box_corners = np.int32(box)
+
+                # 计算需要的填充
+                box_x_min, box_x_max = np.min(box_corners[:, 0]), np.max(box_corners[:, 0])
+                box_y_min, box_y_max = np.min(box_corners[:, 1]), np.max(box_corners[:, 1])
+
+                if box_x_min <= 0: left_pad = abs(box_x_min) + BUFFER
+                if box_x_max >= imW: right_pad = (box_x_max - imW) + BUFFER
+                if box_y_min <= 0: top_pad = abs(box_y_min) + BUFFER
+                if box_y_max >= imH: bottom_pad = (box_y_max - imH) + BUFFER
+                left_pad, top_pad, right_pad, bottom_pad = (
+                    -(-int(pad) // step) * step for pad in (left_pad, top_pad, right_pad, bottom_pad))
+
+                # 调整角点位置（在副本上，不修改调用方的角点）
+                corners = corners.copy()
+                corners[:, 0] += left_pad
+                corners[:, 1] += top_pad
+
+                if self.copy_padding:
+                    # 先建金字塔再扩展，与不复制的路径在同一层图像上采样
+                    for _ in range(levels):
+                        image = cv2.pyrDown(image)
+                    pyramid_built = True
+                    level_h, level_w = image.shape[:2]
+                    # 扩展图像
+                    image_extended = np.zeros(((top_pad + bottom_pad) // step + level_h,
+                                             (left_pad + right_pad) // step + level_w) + image.shape[2:],
+                                            dtype=image.dtype)
+                    image_extended[top_pad // step:top_pad // step + level_h,
+                                  left_pad // step:left_pad // step + level_w] = image
+                    image = image_extended
+                    stage.output = image_extended
+                else:
+                    # 扩展出的部分全为 0，与 warpPerspective 的 BORDER_CONSTANT 相同，
+                    # 只需在原图上采样时平移 (left_pad, top_pad)。单应矩阵仍由平移后的角点求出，
+                    # 输出尺寸和采样坐标与扩展整图时逐像素相同
+                    offset = np.array([[1, 0, left_pad], [0, 1, top_pad], [0, 0, 1]], dtype=np.float64)
+
+        with self.stats.stage('perspective_warp') as stage:
+            # 执行透视变换
+            corners = order_points(corners)
+            destination_corners = find_dest(corners)
+            natural_size = (int(destination_corners[2][0]), int(destination_corners[2][1]))
+            width, height = self.output_size_for(*natural_size)
+            if (width, height) != natural_size:
+                # 直接按目标尺寸采样，不先按原始尺寸变换再缩放
+                destination_corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+            M = cv2.getPerspectiveTransform(corners, destination_corners)
+            if offset is not None:
+                M = M @ offset
+            if source_matrix is not None:
+                M = M @ source_matrix
+
+            if not pyramid_built:
+                for _ in range(levels):
+                    image = cv2.pyrDown(image)
+            if levels:
+                M = M @ np.diag([float(step), float(step), 1.0])
+
+            warped = cv2.warpPerspective(image, M, (width, height),
+                                        flags=self.WARP_INTERPOLATIONS[self.warp_interpolation],
+                                        borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+            # uint8 输入时 warpPerspective 已经饱和取整，不需要再截断和复制
+            if warped.dtype != np.uint8:
+                warped = np.clip(warped, 0, 255).astype(np.uint8)
+            stage.output = warped
         return warped
 
     def binarize(self, image=None, remove_shadow=None):
@@ -201,34 +613,33 @@ class ImageProcessor:
         if remove_shadow is None:
             remove_shadow = self.remove_shadow
             
-        if len(image.shape) == 3:
-            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            gray = l
-        else:
-            gray = image
+        height, width = image.shape[:2]
+        strips = min(self.binarize_threads, height // self.BINARIZE_MIN_STRIP_ROWS)
+        if strips > 1:
+            return self._binarize_strips(image, remove_shadow, strips)
+
+        with self.stats.stage('grayscale') as stage:
+            gray = self._luma(image)
+            stage.output = gray
 
-        height, width = gray.shape[:2]
         min_dim = min(height, width)
         
         if remove_shadow:
-            # 优化的单尺度 Retinex 处理
-            gray_float = gray.astype(np.float32)
-            
-            # 1. 使用稍大的 sigma 值来减少局部噪声
-            sigma = min_dim // 20
-            kernel_size = int(sigma * 3) | 1
-            blur = cv2.GaussianBlur(gray_float, (kernel_size, kernel_size), 0)
-            
-            # 2. 调整 Retinex 计算，减少过度增强
-            retinex = np.maximum(gray_float / (blur + 1.0), 0.3)  # 限制最小值
-            
-            # 3. 更温和的归一化
-            retinex = ((retinex - retinex.min()) / 
-                      (retinex.max() - retinex.min()) * 220 + 35)  # 控制动态范围
-            
-            # 4. 轻微的高斯模糊去除噪点
-            gray = cv2.GaussianBlur(retinex.astype(np.uint8), (3, 3), 0)
+            with self.stats.stage('shadow_removal') as stage:
+                # 优化的单尺度 Retinex 处理
+                gray_float = gray.astype(np.float32)
+
+                # 1. 使用稍大的 sigma 值来减少局部噪声
+                sigma = min_dim // 20
+                kernel_size = int(sigma * 3) | 1
+                blur = self._estimate_illumination(gray_float, kernel_size)
+
+                # 2. 调整 Retinex 计算，减少过度增强
+                retinex = np.maximum(gray_float / (blur + 1.0), 0.3)  # 限制最小值
+
+                # 3. 更温和的归一化，4. 轻微的高斯模糊去除噪点
+                gray = self._normalize_retinex(retinex, retinex.min(), retinex.max())
+                stage.output = gray
         
         # 动态调整参数
         block_size = max(min_dim // 30, 11)
@@ -237,83 +648,427 @@ class ImageProcessor:
             
         # 对低分辨率图像进行预处理
         if min_dim < 1000:
-            gray = cv2.bilateralFilter(gray, 9, 75, 75)
-        
-        # 自适应阈值处理
-        binary = cv2.adaptiveThreshold(
-            gray,
-            255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY,
-            blockSize=block_size,
-            C=20
-        )
-        
-        # 形态学操作
-        kernel_size = 2 if min_dim >= 1000 else 1
-        kernel = np.ones((kernel_size, kernel_size), np.uint8)
-        denoised = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-        
+            with self.stats.stage('bilateral_filter') as stage:
+                gray = cv2.bilateralFilter(gray, 9, 75, 75)
+                stage.output = gray
+
+        with self.stats.stage('adaptive_threshold') as stage:
+            binary = self._local_threshold(gray, block_size)
+            stage.output = binary
+
+        with self.stats.stage('morphology') as stage:
+            # 形态学操作
+            kernel_size = 2 if min_dim >= 1000 else 1
+            kernel = np.ones((kernel_size, kernel_size), np.uint8)
+            denoised = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+            stage.output = denoised
+
         return denoised
 
+    def _binarize_strips(self, image, remove_shadow, strips):
+        """把页面分成水平条带在线程池中二值化，结果与 binarize 整页处理逐像素相同
+
+        每个条带上下多取 halo 行（后续各滤波核半径之和），处理后只保留条带本身的行。
+        Retinex 的归一化需要整页的最小/最大值，因此分两步：先并行计算各条带的 Retinex
+        和极值，汇总后再并行完成归一化、双边滤波、阈值和形态学操作。
+        """
+        height, width = image.shape[:2]
+        min_dim = min(height, width)
+        bounds = np.linspace(0, height, strips + 1).astype(int)
+        spans = list(zip(bounds[:-1], bounds[1:]))
+
+        def extend(top, bottom, halo):
+            return max(top - halo, 0), min(bottom + halo, height)
+
+        sigma = min_dim // 20
+        shadow_kernel = int(sigma * 3) | 1
+        block_size = max(min_dim // 30, 11) | 1
+        bilateral = min_dim < 1000
+        morph_size = 2 if min_dim >= 1000 else 1
+        # 3x3 高斯、双边滤波（d=9）、阈值窗口、闭运算（膨胀和腐蚀各一次）依次扩大依赖范围
+        halo = (1 if remove_shadow else 0) + (4 if bilateral else 0) + block_size // 2 + 2 * morph_size
+
+        gray = np.empty((height, width), np.uint8)
+        binary = np.empty((height, width), np.uint8)
+        retinex = np.empty((height, width), np.float32) if remove_shadow else None
+
+        def to_gray(span):
+            top, bottom = span
+            gray[top:bottom] = self._luma(image[top:bottom])
+
+        def to_retinex(span):
+            top, bottom = span
+            if illumination is None:
+                start, stop = extend(top, bottom, shadow_kernel // 2)
+                blur = self._estimate_illumination(gray[start:stop].astype(np.float32), shadow_kernel)
+                blur = blur[top - start:bottom - start]
+            else:
+                blur = illumination[top:bottom]
+            strip = np.maximum(gray[top:bottom].astype(np.float32) / (blur + 1.0), 0.3)
+            retinex[top:bottom] = strip
+            return strip.min(), strip.max()
+
+        def to_binary(span):
+            top, bottom = span
+            start, stop = extend(top, bottom, halo)
+            if remove_shadow:
+                strip = self._normalize_retinex(retinex[start:stop], low, high)
+            else:
+                strip = gray[start:stop]
+            if bilateral:
+                strip = cv2.bilateralFilter(strip, 9, 75, 75)
+            strip = self._local_threshold(strip, block_size)
+            kernel = np.ones((morph_size, morph_size), np.uint8)
+            strip = cv2.morphologyEx(strip, cv2.MORPH_CLOSE, kernel)
+            binary[top:bottom] = strip[top - start:bottom - start]
+
+        with ThreadPoolExecutor(strips) as executor:
+            with self.stats.stage('grayscale') as stage:
+                list(executor.map(to_gray, spans))
+                stage.output = gray
+
+            if remove_shadow:
+                with self.stats.stage('shadow_removal') as stage:
+                    illumination = None
+                    if self.shadow_method == 'pyramid':
+                        # 金字塔各层的采样位置与条带划分无关才能逐像素一致，光照分量仍整页估计（本身很快）
+                        illumination = self._estimate_illumination(gray.astype(np.float32), shadow_kernel)
+                    extrema = list(executor.map(to_retinex, spans))
+                    low = min(strip_low for strip_low, _ in extrema)
+                    high = max(strip_high for _, strip_high in extrema)
+                    stage.output = retinex
+
+            with self.stats.stage('strip_threshold') as stage:
+                list(executor.map(to_binary, spans))
+                stage.output = binary
+
+        return binary
+
+    @staticmethod
+    def _luma(image):
+        """取 LAB 的 L 通道作为灰度，单通道图像直接返回"""
+        if len(image.shape) == 3:
+            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+            l, a, b = cv2.split(lab)
+            return l
+        return image
+
+    @staticmethod
+    def _normalize_retinex(retinex, low, high):
+        """把 Retinex 结果线性映射到 [35, 255]（控制动态范围），再用 3x3 高斯模糊去除噪点"""
+        normalized = (retinex - low) / (high - low) * 220 + 35
+        return cv2.GaussianBlur(normalized.astype(np.uint8), (3, 3), 0)
+
+    def _local_threshold(self, gray, block_size):
+        """按 binarize_engine 做局部阈值二值化"""
+        if self.binarize_engine not in self.BINARIZE_ENGINES:
+            raise ValueError(f"未知的二值化方法: {self.binarize_engine}")
+        if self.binarize_engine == 'adaptive':
+            # 自适应阈值处理
+            return cv2.adaptiveThreshold(
+                gray,
+                255,
+                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                cv2.THRESH_BINARY,
+                blockSize=block_size,
+                C=20
+            )
+        return self._integral_threshold(gray, block_size)
+
+    def _integral_threshold(self, gray, block_size):
+        """用积分图计算 block_size 方窗内的均值和标准差，按 Sauvola / Niblack 公式逐像素取阈值
+
+        窗口和由积分图四个角相减得到，每个像素的计算量与窗口大小无关。边界按
+        BORDER_REPLICATE 扩展，与 adaptiveThreshold 一致。按行分块处理，
+        每块的灰度和积分用 int32 保存（块大小保证不溢出），平方和积分用 float64。
+        """
+        height, width = gray.shape[:2]
+        radius = block_size // 2
+        padded = cv2.copyMakeBorder(gray, radius, radius, radius, radius, cv2.BORDER_REPLICATE)
+        max_rows = (2 ** 31 - 1) // 255 // (width + block_size) - block_size
+        band_rows = max(min(self.INTEGRAL_BAND_ROWS, max_rows), 1)
+        area = float(block_size * block_size)
+        binary = np.empty_like(gray)
+        b = block_size
+
+        for top in range(0, height, band_rows):
+            bottom = min(top + band_rows, height)
+            sums, sqsums = cv2.integral2(padded[top:bottom + b - 1],
+                                         sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F)
+            window_sum = sums[b:, b:] - sums[:-b, b:]
+            window_sum -= sums[b:, :-b]
+            window_sum += sums[:-b, :-b]
+            window_sqsum = sqsums[b:, b:] - sqsums[:-b, b:]
+            window_sqsum -= sqsums[b:, :-b]
+            window_sqsum += sqsums[:-b, :-b]
+
+            mean = window_sum.astype(np.float32)
+            mean *= 1 / area
+            threshold = window_sqsum.astype(np.float32)
+            threshold *= 1 / area
+            threshold -= mean * mean
+            np.maximum(threshold, 0, out=threshold)
+            np.sqrt(threshold, out=threshold)  # 标准差
+            if self.binarize_engine == 'sauvola':
+                threshold *= self.SAUVOLA_K / self.SAUVOLA_R
+                threshold += 1 - self.SAUVOLA_K
+                threshold *= mean
+            else:
+                threshold *= self.NIBLACK_K
+                threshold += mean
+                threshold -= self.NIBLACK_C
+            np.greater(gray[top:bottom], threshold, out=binary[top:bottom])
+
+        binary *= 255
+        return binary
+
+    def _estimate_illumination(self, gray_float, kernel_size):
+        """估计光照（背景）分量，等效于 kernel_size 的高斯模糊"""
+        if self.shadow_method not in self.SHADOW_METHODS:
+            raise ValueError(f"未知的阴影去除方法: {self.shadow_method}")
+        if self.shadow_method == 'pyramid':
+            return self._pyramid_blur(gray_float, kernel_size)
+        return cv2.GaussianBlur(gray_float, (kernel_size, kernel_size), 0)
+
+    def _pyramid_blur(self, image, kernel_size):
+        """在图像金字塔的低分辨率层上完成大核高斯模糊，再放大回原尺寸
+
+        pyrDown 每一层相当于在该层做 σ≈1 的高斯模糊后隔点采样，L 层在原图上累计的方差为
+        (4^L - 1) / 3；剩余的方差在第 L 层上补足，整体与原图上的 GaussianBlur(kernel_size)
+        等效，而计算量随层数按 4^L 减少。光照分量很平滑，线性插值放大不会引入可见误差。
+        """
+        # OpenCV 由核大小推出的 σ
+        sigma = 0.3 * ((kernel_size - 1) * 0.5 - 1) + 0.8
+        levels = 0
+        while sigma / 2 ** (levels + 1) >= self.PYRAMID_MIN_SIGMA:
+            levels += 1
+        if levels == 0:
+            return cv2.GaussianBlur(image, (kernel_size, kernel_size), 0)
+
+        # 先按原图的边界方式（BORDER_REFLECT_101）扩展半个核宽，边缘附近的结果与整图模糊一致
+        pad = kernel_size // 2
+        low = cv2.copyMakeBorder(image, pad, pad, pad, pad, cv2.BORDER_REFLECT_101)
+        for _ in range(levels):
+            low = cv2.pyrDown(low)
+        scale = 2 ** levels
+        residual = np.sqrt(sigma ** 2 - (4 ** levels - 1) / 3) / scale
+        low = cv2.GaussianBlur(low, (0, 0), residual)
+
+        # 第 L 层的像素 j 对应扩展后图像的像素 scale * j，即原图像素 scale * j - pad
+        height, width = image.shape[:2]
+        M = np.float32([[scale, 0, -pad], [0, scale, -pad]])
+        return cv2.warpAffine(low, M, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
     def rotate_image(self, clockwise=True):
-        """旋转图像90度"""
-        if self.image is None:
+        """旋转图像90度
+        只记录变换并返回视图，不采样完整分辨率的图像：处理时合进透视变换，从原图只采样一次；
+        显示用 preview_image。旋转总是相对原图重新采样，多次旋转不会累积误差
+        """
+        if self.view is None:
             return None
-        # 顺时针旋转90度，逆时针旋转-90度
-        angle = 90 if clockwise else -90
-        self.image = cv2.rotate(self.image, cv2.ROTATE_90_CLOCKWISE if clockwise else cv2.ROTATE_90_COUNTERCLOCKWISE)
-        return self.image
+        self.view.rotate90(clockwise)
+        return self.view
+
+    def crop_image(self, x, y, width, height):
+        """裁剪当前图像，只记录变换并返回视图，处理时合进透视变换"""
+        if self.view is None:
+            return None
+        self.view.crop(x, y, width, height)
+        return self.view
+
+    def scale_image(self, fx, fy=None):
+        """缩放当前图像，只记录变换并返回视图，处理时合进透视变换"""
+        if self.view is None:
+            return None
+        self.view.scale(fx, fy)
+        return self.view
+
+    def preview_image(self, max_size):
+        """当前图像长边不超过 max_size 的预览（界面显示用），不采样完整分辨率的图像"""
+        if self.view is None:
+            return None
+        return self.view.preview(max_size)
 
     def unwarp_document(self, image=None):
         """Unwarp document using deep learning model"""
         if image is None:
             image = self.image
             
+        return self.unwarp_documents([image])[0]
+
+    def unwarp_documents(self, images, batch_size=None):
+        """Unwarp a batch of documents.
+
+        All pages go through UVDocnet in one forward pass; pages with the same
+        size are then grouped so the grid upsampling and sampling also run batched.
+        With unwarp_memory_budget set, each page is resampled in column bands
+        instead (see _unwarp_tiled), with identical output. Pages are resampled
+        straight to output_size_for(width, height) of their input size. The 'remap' backend
+        resamples the uint8 page with cv2.remap (see remap_unwarping); its output
+        matches the torch backend within a few grey levels.
+        Args:
+            images: list of BGR images
+            batch_size: max pages per forward pass, UNWARP_BATCH_SIZE if None
+        Returns:
+            list of unwarped BGR images, in input order
+        """
         self._ensure_unwarp_model_loaded()
         
         if self.unwarp_model is None:
             raise ValueError("Cannot load unwarp model")
 
-        # 使用正确的输入尺寸 [488, 712]
-        IMG_SIZE = (488, 712)  # 可以将这个作为类常量
-        
-        # Preprocess image
-        img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).astype(np.float32) / 255
-        inp = torch.from_numpy(cv2.resize(img_rgb, IMG_SIZE).transpose(2, 0, 1)).unsqueeze(0)
-        inp = inp.to(self.device)
-
         # 确保模型处于评估模式
         self.unwarp_model.eval()
-        
-        with torch.no_grad():
-            point_positions2D, _ = self.unwarp_model(inp)
-
-        # Unwarp
-        size = image.shape[:2][::-1]
-        unwarped = bilinear_unwarping(
-            warped_img=torch.from_numpy(img_rgb.transpose(2, 0, 1)).unsqueeze(0).to(self.device),
-            point_positions=torch.unsqueeze(point_positions2D[0], dim=0),
-            img_size=tuple(size),
-        )
-        
-        # Post-process
-        unwarped = (unwarped[0].detach().cpu().numpy().transpose(1, 2, 0) * 255).astype(np.uint8)
-        unwarped_bgr = cv2.cvtColor(unwarped, cv2.COLOR_RGB2BGR)
-        
-        return unwarped_bgr
 
-    def process_document(self, image_path=None):
-        """Complete document processing pipeline"""
+        if self.unwarp_backend not in self.UNWARP_BACKENDS:
+            raise ValueError(f"Unknown unwarp backend: {self.unwarp_backend}")
+
+        import torch
+        batch_size = batch_size or self.UNWARP_BATCH_SIZE
+        remap = self.unwarp_backend == 'remap'
+        tiled = self.unwarp_memory_budget is not None
+        results = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+
+            with self.stats.stage('unwarp_preprocess') as stage:
+                # Preprocess images
+                if remap:
+                    # Shrink the uint8 page first, no full-size float copy at all
+                    imgs_rgb = None
+                    inp = torch.cat([self._prepare_unwarp_input(self._to_float_rgb(
+                        cv2.resize(image, self.UNWARP_INPUT_SIZE))) for image in chunk])
+                elif tiled:
+                    # The full-size float copy of each page only lives until it is resized
+                    imgs_rgb = None
+                    inp = torch.cat([self._prepare_unwarp_input(self._to_float_rgb(image)) for image in chunk])
+                else:
+                    imgs_rgb = [self._to_float_rgb(image) for image in chunk]
+                    inp = torch.cat([self._prepare_unwarp_input(img_rgb) for img_rgb in imgs_rgb])
+                inp = inp.to(self.device)
+                stage.output = inp
+
+            with self.stats.stage('unwarp_forward') as stage:
+                with torch.no_grad():
+                    point_positions2D = self.unwarp_model(inp)[0]
+                stage.output = point_positions2D
+
+            if remap or tiled:
+                with self.stats.stage('unwarp_resample') as stage:
+                    if remap:
+                        budget = self.unwarp_memory_budget or self.REMAP_MEMORY_BUDGET
+                        unwarped_chunk = [remap_unwarping(image, point_positions2D[i:i + 1], budget,
+                                                          self.output_size_for(image.shape[1], image.shape[0]))
+                                          for i, image in enumerate(chunk)]
+                    else:
+                        unwarped_chunk = [self._unwarp_tiled(image, point_positions2D[i:i + 1])
+                                          for i, image in enumerate(chunk)]
+                    stage.output = unwarped_chunk
+                results.extend(unwarped_chunk)
+                continue
+
+            # Bucket pages by output size so each bucket is unwarped in one call
+            buckets = {}
+            for i, img_rgb in enumerate(imgs_rgb):
+                buckets.setdefault(img_rgb.shape[:2], []).append(i)
+
+            unwarped_chunk = [None] * len(chunk)
+            with self.stats.stage('unwarp_resample') as stage:
+                for (height, width), indices in buckets.items():
+                    warped_img = torch.stack([torch.from_numpy(imgs_rgb[i].transpose(2, 0, 1)) for i in indices])
+                    unwarped = bilinear_unwarping(
+                        warped_img=warped_img.to(self.device),
+                        point_positions=point_positions2D[indices],
+                        img_size=self.output_size_for(width, height),
+                    )
+                    del warped_img
+
+                    # Post-process
+                    unwarped = unwarped.detach().cpu().numpy()
+                    for i, page in zip(indices, unwarped):
+                        page = (page.transpose(1, 2, 0) * 255).astype(np.uint8)
+                        unwarped_chunk[i] = cv2.cvtColor(page, cv2.COLOR_RGB2BGR)
+                stage.output = unwarped_chunk
+            results.extend(unwarped_chunk)
+
+        return results
+
+    def _unwarp_tiled(self, image, point_positions):
+        """Resample one page in column bands within unwarp_memory_budget.
+
+        The float input is built straight from the uint8 page and each band is
+        converted to uint8 BGR right away, so besides the float input only one
+        band of grid and float output exists at a time.
+        Args:
+            image: uint8 BGR image
+            point_positions: 1x2xGhxGw grid predicted by UVDocnet
+        Returns:
+            unwarped uint8 BGR image, sized by output_size_for
+        """
+        import torch
+        height, width = image.shape[:2]
+        rgb = torch.from_numpy(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).permute(2, 0, 1)
+        warped_img = torch.empty((1, 3, height, width), dtype=torch.float32, device=self.device)
+        warped_img.copy_(rgb).div_(255)
+        del rgb
+
+        out_width, out_height = self.output_size_for(width, height)
+        unwarped = np.empty((out_height, out_width, 3), dtype=np.uint8)
+        for start, stop, band in bilinear_unwarping_bands(warped_img, point_positions, (out_width, out_height),
+                                                          self.unwarp_memory_budget):
+            band = band[0].mul_(255).to(torch.uint8).cpu().numpy()
+            # RGB -> BGR while copying into the output
+            unwarped[:, start:stop] = band.transpose(1, 2, 0)[:, :, ::-1]
+        return unwarped
+
+    @staticmethod
+    def _to_float_rgb(image):
+        """uint8 BGR -> float32 RGB in [0, 1]"""
+        img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).astype(np.float32)
+        img_rgb /= 255  # in place, avoids a second full-size float copy
+        return img_rgb
+
+    def _prepare_unwarp_input(self, img_rgb):
+        """Resize a float RGB image to the UVDocnet input, shape 1x3xHxW"""
+        import torch
+        return torch.from_numpy(cv2.resize(img_rgb, self.UNWARP_INPUT_SIZE).transpose(2, 0, 1)).unsqueeze(0)
+
+    def process_document(self, image_path=None, return_stats=False):
+        """Complete document processing pipeline
+        Args:
+            image_path: image to load, uses the current image if None
+            return_stats: also return a PageStats with wall time, CPU time and
+                output size of every stage
+        Returns:
+            binary image, or (binary image, PageStats) if return_stats is set
+        """
+        if not return_stats:
+            return self._process_document(image_path)
+
+        stats = self.stats.start()
+        try:
+            binary = self._process_document(image_path)
+        finally:
+            self.stats.stop()
+        return binary, stats
+
+    def _process_document(self, image_path=None):
+        if image_path and self.reduced_decode and not self.enable_unwarp:
+            return self._process_document_reduced(image_path)
+
         # Load image if path is provided
         if image_path:
-            image = self.load_image(image_path)
+            with self.stats.stage('imread') as stage:
+                image = self.load_image(image_path)
+                stage.output = image
             if image is None:
                 raise ValueError("Cannot load image")
         else:
-            image = self.image
-            if image is None:
+            if self.view is None:
                 raise ValueError("Image not loaded")
+            if not self.enable_unwarp and not self.view.is_identity:
+                return self._process_view(self.view)
+            image = self.image
 
         if self.enable_unwarp:
             # 如果启用扭曲矫正，直接进行矫正
@@ -330,10 +1085,88 @@ class ImageProcessor:
         
         return binary
 
+    def _process_view(self, view):
+        """处理带有旋转 / 裁剪 / 缩放记录的图像：在原图上检测，变换合进透视变换，只采样一次"""
+        if view.cropped:
+            # 裁剪掉的部分不能参与检测，在视图上检测（视图比原图小）
+            corners = self.detect_document(view.materialize())
+        else:
+            corners = self.detect_document(view.source)
+            if corners is not None:
+                corners = view.map_points(corners)
+        if corners is None:
+            raise ValueError("Cannot detect document boundaries")
+        transformed = self.perspective_transform(view, corners)
+        return self.binarize(transformed)
+
+    def _process_document_reduced(self, image_path):
+        """两级解码：降采样图像做边界检测，同时在后台线程完整解码，只用于透视变换"""
+        with ThreadPoolExecutor(1) as executor:
+            # cv2.imread 执行时释放 GIL，完整解码与降采样解码、模型推理并行
+            full_image = executor.submit(self.load_image, image_path)
+
+            with self.stats.stage('imread_reduced') as stage:
+                small = self.load_detection_image(image_path)
+                stage.output = small
+            if small is None:
+                raise ValueError("Cannot load image")
+            corners = self.detect_document(small)
+            if corners is None:
+                raise ValueError("Cannot detect document boundaries")
+
+            # 只记录等待完整解码的时间，与检测重叠的部分不计入
+            with self.stats.stage('imread') as stage:
+                image = full_image.result()
+                stage.output = image
+        if image is None:
+            raise ValueError("Cannot load image")
+
+        corners = self.scale_corners(corners, small.shape, image.shape)
+        transformed = self.perspective_transform(image, corners)
+        return self.binarize(transformed)
+
+    def process_documents(self, images, batch_size=None):
+        """批量处理已加载的图像，边界检测合并为批次推理
+        Args:
+            images: 图像列表
+            batch_size: 每次前向推理的最大图像数
+        Returns:
+            与输入对应的二值化结果列表，未检测到边界的图像为 None
+        """
+        if self.enable_unwarp:
+            return [self.binarize(unwarped) for unwarped in self.unwarp_documents(images, batch_size)]
+
+        results = []
+        for image, corners in zip(images, self.detect_documents(images, batch_size)):
+            if corners is None:
+                results.append(None)
+                continue
+            transformed = self.perspective_transform(image, corners)
+            results.append(self.binarize(transformed))
+        return results
+
     def set_shadow_removal(self, enabled=True):
         """设置是否启用阴影去除"""
         self.remove_shadow = enabled
 
     def set_unwarp(self, enabled=True):
         """设置是否启用扭曲矫正"""
-        self.enable_unwarp = enabled
\ No newline at end of file
+        self.enable_unwarp = enabled
+
+    def set_int8(self, enabled=True, calibration_images=None):
+        """设置是否启用 int8 量化推理
+        Args:
+            enabled: 是否启用，启用后推理固定在 CPU 上
+            calibration_images: 校准图像路径列表，为None时使用 CALIBRATION_DIR 下的图像
+        """
+        self.int8 = enabled
+        if calibration_images is not None:
+            self.calibration_images = list(calibration_images)
+        if enabled:
+            import torch
+            self.device = torch.device('cpu')
+        else:
+            self._device = None  # 关闭后按是否有 CUDA 重新选择设备
+        # 已加载的模型需按新设置重新加载
+        self.model = None
+        self.unwarp_model = None
\ No newline at end of file
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# 单个阶段的记录：墙钟时间、进程 CPU 时间（含 torch / OpenCV 内部线程）、输出数组的字节数和形状
+StageRecord = namedtuple('StageRecord', ['name', 'wall', 'cpu', 'nbytes', 'shape'])
+
+
+class _Stage:
+    """记录一个阶段的上下文，阶段内把输出赋给 output 即可记录其大小"""
+    __slots__ = ('name', 'stats', 'output', '_wall', '_cpu')
+
+    def __init__(self, name, stats):
+        self.name = name
+        self.stats = stats
+        self.output = None
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        nbytes, shape = _describe(self.output)
+        self.stats.stages.append(StageRecord(self.name, wall, cpu, nbytes, shape))
+        return False
+
+
+class _NullStage:
+    """未开启统计时使用的空上下文"""
+    __slots__ = ('output',)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _describe(output):
+    if output is None:
+        return 0, None
+    if isinstance(output, (list, tuple)):
+        sizes = [_describe(item) for item in output]
+        return sum(nbytes for nbytes, _ in sizes), (len(output),)
+    nbytes = getattr(output, 'nbytes', None)
+    if nbytes is None and hasattr(output, 'element_size'):
+        nbytes = output.element_size() * output.nelement()
+    shape = getattr(output, 'shape', None)
+    return int(nbytes or 0), tuple(shape) if shape is not None else None
+
+
+class PageStats:
+    """一页图像各处理阶段的记录"""
+
+    def __init__(self):
+        self.stages = []
+
+    @property
+    def wall(self):
+        return sum(stage.wall for stage in self.stages)
+
+    @property
+    def cpu(self):
+        return sum(stage.cpu for stage in self.stages)
+
+    def to_dict(self):
+        return {
+            'wall': self.wall,
+            'cpu': self.cpu,
+            'stages': [
+                {'name': s.name, 'wall': s.wall, 'cpu': s.cpu, 'nbytes': s.nbytes,
+                 'shape': list(s.shape) if s.shape is not None else None}
+                for s in self.stages
+            ],
+        }
+
+
+class StageRecorder:
+    """按线程记录当前页的阶段耗时，未开始记录时 stage() 几乎没有开销"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def start(self):
+        """开始记录新的一页，返回 PageStats"""
+        self._local.stats = PageStats()
+        return self._local.stats
+
+    def stop(self):
+        stats = getattr(self._local, 'stats', None)
+        self._local.stats = None
+        return stats
+
+    def stage(self, name):
+        stats = getattr(self._local, 'stats', None)
+        if stats is None:
+            return _NULL_STAGE
+        return _Stage(name, stats)
+
+
+def aggregate_stats(pages):
+    """汇总多页的阶段记录
+    Args:
+        pages: PageStats 或其 to_dict() 结果的列表
+    Returns:
+        按阶段汇总的字典：次数、墙钟/CPU 总时间、平均与分位延迟、平均输出字节数
+    """
+    by_stage = {}
+    for page in pages:
+        if isinstance(page, PageStats):
+            page = page.to_dict()
+        for stage in page['stages']:
+            by_stage.setdefault(stage['name'], []).append(stage)
+
+    summary = {}
+    for name, records in by_stage.items():
+        wall = np.array([r['wall'] for r in records])
+        cpu = np.array([r['cpu'] for r in records])
+        summary[name] = {
+            'count': len(records),
+            'wall_total': float(wall.sum()),
+            'wall_mean': float(wall.mean()),
+            'wall_p50': float(np.percentile(wall, 50)),
+            'wall_p95': float(np.percentile(wall, 95)),
+            'cpu_total': float(cpu.sum()),
+            'nbytes_mean': float(np.mean([r['nbytes'] for r in records])),
+        }
+    return summary
@@ -1,25 +1,7 @@
 import cv2
-from PyQt6.QtGui import QImage, QPixmap
 import numpy as np
 
-import torch
-import torch.nn.functional as F
-
-from .model import UVDocnet
-
-def cv2_to_qpixmap(cv_img):
-    """将 OpenCV 图像转换为 QPixmap"""
-    if len(cv_img.shape) == 2:  # 如果是单通道图像
-        # 转换为三通道图像
-        cv_img = cv2.cvtColor(cv_img, cv2.COLOR_GRAY2RGB)
-    
-    height, width, channel = cv_img.shape
-    bytes_per_line = channel * width
-    # OpenCV 使用 BGR 格式，需要转换为 RGB
-    if channel == 3:  # 确保是彩色图像
-        cv_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-    q_img = QImage(cv_img.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
-    return QPixmap.fromImage(q_img)
+# torch 只在用到模型的函数中导入，纯图像处理路径（及其命令行）不需要加载 torch
 
 def enhance_image(image):
     """图像增强"""
@@ -32,13 +14,60 @@ def enhance_image(image):
     enhanced = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
     return enhanced 
 
-def load_model(ckpt_path):
+def jpeg_size(path):
+    """只读取 JPEG 文件头获取图像尺寸
+    Returns:
+        (宽, 高)，不是 JPEG 或文件头损坏时返回 None
+    """
+    # SOF 标记：C0-CF 中除去 DHT(C4)、JPG(C8)、DAC(CC)
+    sof_markers = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+    try:
+        with open(path, 'rb') as f:
+            if f.read(2) != b'\xff\xd8':
+                return None
+            while True:
+                byte = f.read(1)
+                if not byte:
+                    return None
+                if byte != b'\xff':
+                    continue
+                marker = f.read(1)
+                while marker == b'\xff':  # 填充字节
+                    marker = f.read(1)
+                if not marker:
+                    return None
+                marker = marker[0]
+                if marker == 0x01 or 0xD0 <= marker <= 0xD9:  # 没有长度字段的标记
+                    continue
+                header = f.read(2)
+                if len(header) < 2:
+                    return None
+                length = int.from_bytes(header, 'big')
+                if marker in sof_markers:
+                    data = f.read(5)
+                    if len(data) < 5:
+                        return None
+                    return int.from_bytes(data[3:5], 'big'), int.from_bytes(data[1:3], 'big')
+                f.seek(length - 2, 1)
+    except OSError:
+        return None
+
+def load_model(ckpt_path, with_3d_head=True):
     """
     Load UVDocnet model.
+    Args:
+        ckpt_path:      path of the checkpoint
+        with_3d_head:   keep the 3D point head; when False the model only
+                        predicts the 2D grid and forward returns a 1-tuple
     """
+    import torch
+    from .model import UVDocnet
+
     model = UVDocnet(num_filter=32, kernel_size=5)
     ckpt = torch.load(ckpt_path, map_location=torch.device('cpu'))
     model.load_state_dict(ckpt["model_state"])
+    if not with_3d_head:
+        model.drop_3d_head()
     return model
 
 def bilinear_unwarping(warped_img, point_positions, img_size):
@@ -50,6 +79,8 @@ def bilinear_unwarping(warped_img, point_positions, img_size):
         point_positions:    torch.Tensor of shape Bx2xGhxGw (dtype float)
         img_size:           tuple of int [w, h]
     """
+    import torch.nn.functional as F
+
     upsampled_grid = F.interpolate(
         point_positions, size=(img_size[1], img_size[0]), mode="bilinear", align_corners=True
     )
@@ -58,12 +89,117 @@ def bilinear_unwarping(warped_img, point_positions, img_size):
     return unwarped_img
 
 
+def unwarp_band_width(img_size, bytes_per_pixel, memory_budget):
+    """
+    Width of the column bands used by the tiled unwarp functions.
+    Args:
+        img_size:           tuple of int [w, h]
+        bytes_per_pixel:    temporary bytes per output pixel of one band
+        memory_budget:      bytes allowed for the per-band temporaries
+    """
+    width, height = img_size
+    return int(min(max(memory_budget // (bytes_per_pixel * height), 1), width))
+
+
+def upsampled_grid_bands(point_positions, img_size, band_width):
+    """
+    Upsample the 2D grid to img_size one column band at a time.
+    The grid is first interpolated along the width only (a small Bx2xGhxW tensor),
+    then each band is interpolated along the height. F.interpolate applies the two
+    directions in this order internally, so the bands are bitwise identical to the
+    corresponding columns of the monolithic upsampled grid.
+    Args:
+        point_positions:    torch.Tensor of shape Bx2xGhxGw (dtype float)
+        img_size:           tuple of int [w, h]
+        band_width:         number of output columns per band
+    Yields:
+        (start, stop, grid band of shape Bx2xHx(stop - start))
+    """
+    import torch.nn.functional as F
+
+    width, height = img_size
+    grid_rows = point_positions.shape[2]
+    if band_width >= width:
+        yield 0, width, F.interpolate(point_positions, size=(height, width), mode="bilinear", align_corners=True)
+        return
+
+    row_grid = F.interpolate(point_positions, size=(grid_rows, width), mode="bilinear", align_corners=True)
+    for start in range(0, width, band_width):
+        stop = min(start + band_width, width)
+        yield start, stop, F.interpolate(
+            row_grid[:, :, :, start:stop], size=(height, stop - start), mode="bilinear", align_corners=True
+        )
+
+
+def bilinear_unwarping_bands(warped_img, point_positions, img_size, memory_budget):
+    """
+    Tiled bilinear_unwarping with bounded temporaries.
+    Only one column band of the full-resolution grid and of the float output exists
+    at a time; concatenating the bands along the width gives exactly the output of
+    bilinear_unwarping.
+    Args:
+        warped_img:         torch.Tensor of shape BxCxHxW (dtype float)
+        point_positions:    torch.Tensor of shape Bx2xGhxGw (dtype float)
+        img_size:           tuple of int [w, h]
+        memory_budget:      bytes allowed for the per-band temporaries, not counting
+                            warped_img itself
+    Yields:
+        (start, stop, unwarped band of shape BxCxHx(stop - start))
+    """
+    import torch.nn.functional as F
+
+    batch, channels = warped_img.shape[:2]
+    # grid band, its permuted copy and the float output band
+    bytes_per_pixel = batch * (2 * 4 * 2 + channels * 4)
+    band_width = unwarp_band_width(img_size, bytes_per_pixel, memory_budget)
+    for start, stop, grid in upsampled_grid_bands(point_positions, img_size, band_width):
+        yield start, stop, F.grid_sample(warped_img, grid.transpose(1, 2).transpose(2, 3), align_corners=True)
+
+
+def remap_unwarping(image, point_positions, memory_budget, img_size=None):
+    """
+    Unwarp a uint8 image with cv2.remap instead of grid_sample.
+    The grid is upsampled exactly as in bilinear_unwarping (in column bands),
+    turned into absolute pixel coordinates and converted to fixed-point maps
+    (CV_16SC2 + interpolation table, 1/32 pixel). The uint8 image is sampled
+    directly in its own channel order, with the same zero padding as grid_sample.
+    Args:
+        image:              numpy array of shape HxWxC (dtype uint8)
+        point_positions:    torch.Tensor of shape 1x2xGhxGw (dtype float)
+        memory_budget:      bytes allowed for the per-band temporaries
+        img_size:           output size as tuple of int [w, h], the input size if None
+    Returns:
+        numpy array of shape HxWxC (dtype uint8)
+    """
+    height, width = image.shape[:2]
+    img_size = img_size or (width, height)
+    point_positions = point_positions.float().cpu()
+    unwarped = np.empty((img_size[1], img_size[0]) + image.shape[2:], dtype=image.dtype)
+    # float grid band, the two fixed-point maps and the remapped band
+    bytes_per_pixel = 2 * 4 + 4 + 2 + image.itemsize * (image.shape[2] if image.ndim == 3 else 1)
+    band_width = unwarp_band_width(img_size, bytes_per_pixel, memory_budget)
+    for start, stop, grid in upsampled_grid_bands(point_positions, img_size, band_width):
+        map_x, map_y = grid[0].numpy()
+        # [-1, 1] -> pixel coordinates, as grid_sample with align_corners=True
+        map_x += 1
+        map_x *= (width - 1) / 2
+        map_y += 1
+        map_y *= (height - 1) / 2
+        map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+        del grid, map_x, map_y
+        unwarped[:, start:stop] = cv2.remap(image, map1, map2, cv2.INTER_LINEAR,
+                                            borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+    return unwarped
+
+
 def bilinear_unwarping_from_numpy(warped_img, point_positions, img_size):
     """
     Utility function that unwarps an image.
     Unwarp warped_img based on the 2D grid point_positions with a size img_size.
     Accept numpy arrays as input.
     """
+    import torch
+
     warped_img = torch.unsqueeze(torch.from_numpy(warped_img.transpose(2, 0, 1)).float(), dim=0)
     point_positions = torch.unsqueeze(torch.from_numpy(point_positions.transpose(2, 0, 1)).float(), dim=0)
 
@@ -0,0 +1,128 @@
+import cv2
+import numpy as np
+
+# 逆时针旋转 k 个 90 度（np.rot90）对应的坐标变换的线性部分，像素中心位于整数坐标
+_ROT90 = {
+    0: ((1, 0), (0, 1)),
+    1: ((0, 1), (-1, 0)),
+    2: ((-1, 0), (0, -1)),
+    3: ((0, -1), (1, 0)),
+}
+
+
+class ImageView:
+    """源图像加上记录下来的几何变换，需要像素时才一次性采样
+
+    旋转、裁剪和缩放只累积为一个 3x3 矩阵（源图像坐标 -> 视图坐标），源图像本身不变。
+    透视变换可以把这个矩阵合进单应矩阵，直接从源图像采样到输出，全程只触碰一次像素。
+
+    Args:
+        source: 源图像
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.matrix = np.eye(3)
+        self.size = (source.shape[1], source.shape[0])  # 视图的 (宽, 高)
+        self.cropped = False  # 裁剪过时视图不再包含整张源图像
+        self._pixels = source
+        self._thumbnail = None  # (整数缩小倍数, 缩小的源图像)，预览共用，源图像不变所以只计算一次
+
+    @property
+    def is_identity(self):
+        return np.array_equal(self.matrix, np.eye(3)) and self.size == (self.source.shape[1], self.source.shape[0])
+
+    @property
+    def is_materialized(self):
+        """视图像素已经采样并缓存（例如已经显示过）"""
+        return self._pixels is not None
+
+    def rotate90(self, clockwise=True):
+        """旋转 90 度"""
+        width, height = self.size
+        if clockwise:
+            step = np.array([[0, -1, height - 1], [1, 0, 0], [0, 0, 1]], dtype=np.float64)
+        else:
+            step = np.array([[0, 1, 0], [-1, 0, width - 1], [0, 0, 1]], dtype=np.float64)
+        self._compose(step, (height, width))
+
+    def crop(self, x, y, width, height):
+        """保留视图中以 (x, y) 为左上角、width x height 的区域"""
+        step = np.array([[1, 0, -x], [0, 1, -y], [0, 0, 1]], dtype=np.float64)
+        self._compose(step, (int(width), int(height)))
+        self.cropped = True
+
+    def scale(self, fx, fy=None):
+        """缩放视图，坐标约定与 cv2.resize 相同"""
+        fy = fx if fy is None else fy
+        width, height = self.size
+        step = np.array([[fx, 0, 0.5 * fx - 0.5], [0, fy, 0.5 * fy - 0.5], [0, 0, 1]], dtype=np.float64)
+        self._compose(step, (max(int(round(width * fx)), 1), max(int(round(height * fy)), 1)))
+
+    def map_points(self, points):
+        """把源图像上的点换算到视图坐标"""
+        points = np.asarray(points, dtype=np.float64)
+        mapped = points @ self.matrix[:2, :2].T + self.matrix[:2, 2]
+        return mapped.astype(np.float32)
+
+    def materialize(self):
+        """按累积的变换采样出视图图像，结果会缓存到下一次变换"""
+        if self._pixels is None:
+            self._pixels = self._render()
+        return self._pixels
+
+    def preview(self, max_size):
+        """采样长边不超过 max_size 的视图预览（界面显示用），不采样完整分辨率的视图
+
+        从源图像按整数倍数块平均得到的缩小图（只计算一次）上采样，每次变换后重新预览只处理预览大小的像素
+        """
+        width, height = self.size
+        scale = min(max_size / max(width, height), 1.0)
+        size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+        factor, thumbnail = self._get_thumbnail(scale)
+        # 预览坐标 <- 视图坐标 <- 源图像坐标 <- 缩小图坐标，坐标约定与 cv2.resize 相同
+        to_preview = np.array([[scale, 0, 0.5 * scale - 0.5], [0, scale, 0.5 * scale - 0.5], [0, 0, 1]])
+        from_thumbnail = np.array([[factor, 0, 0.5 * factor - 0.5], [0, factor, 0.5 * factor - 0.5], [0, 0, 1]])
+        matrix = to_preview @ self.matrix @ from_thumbnail
+        return cv2.warpAffine(thumbnail, matrix[:2], size, flags=cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_REPLICATE)
+
+    def _get_thumbnail(self, scale):
+        # 视图缩放会改变所需的源图像分辨率，按源图像每像素对应的预览像素数选择倍数
+        source_scale = scale * np.sqrt(abs(np.linalg.det(self.matrix[:2, :2])))
+        factor = max(int(1 / source_scale), 1) if source_scale > 0 else 1
+        if self._thumbnail is None or self._thumbnail[0] > factor:
+            height, width = self.source.shape[:2]
+            height, width = max(height // factor, 1), max(width // factor, 1)
+            thumbnail = self.source[:height * factor, :width * factor]
+            if factor > 1:
+                thumbnail = cv2.resize(thumbnail, (width, height), interpolation=cv2.INTER_AREA)
+            self._thumbnail = (factor, thumbnail)
+        return self._thumbnail
+
+    def _compose(self, step, size):
+        self.matrix = step @ self.matrix
+        self.size = size
+        self._pixels = None
+
+    def _render(self):
+        if self.is_identity:
+            return self.source
+        linear = self.matrix[:2, :2]
+        offset = self.matrix[:2, 2]
+        width, height = self.size
+        # 只有 90 度旋转和整数平移时，直接旋转数组再截取，结果与 cv2.rotate 逐像素相同
+        for k, rotation in _ROT90.items():
+            if np.array_equal(linear, rotation) and np.array_equal(offset, np.round(offset)):
+                rotated = np.rot90(self.source, k)
+                # np.rot90 本身的平移量：源图像角点变换后的最小坐标为 0
+                src_height, src_width = self.source.shape[:2]
+                box = np.array([[0, 0], [src_width - 1, 0], [0, src_height - 1], [src_width - 1, src_height - 1]])
+                left, top = (-(box @ linear.T).min(axis=0) - offset).astype(int)
+                if (left >= 0 and top >= 0 and left + width <= rotated.shape[1]
+                        and top + height <= rotated.shape[0]):
+                    return np.ascontiguousarray(rotated[top:top + height, left:left + width])
+                break
+        # 边界复制与 cv2.resize 一致，缩放后最右 / 最下一列不会混入黑边
+        return cv2.warpAffine(self.source, self.matrix[:2], (width, height), flags=cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_REPLICATE)
@@ -4,7 +4,7 @@ from PyQt6.QtCore import Qt, QMimeData, pyqtSignal
 from PyQt6.QtGui import QImage, QPixmap, QIcon, QDragEnterEvent, QDropEvent, QPainter, QPen
 import cv2
 import os
-from core.utils import cv2_to_qpixmap
+from gui.utils import cv2_to_qpixmap
 
 class ClickableLabel(QLabel):
     clicked = pyqtSignal()
@@ -359,8 +359,10 @@ class MainWindow(QMainWindow):
             self.original_image_label.update()  # 更新显示
         self.scan_requested.emit()
             
-    def display_image(self, image, label):
-        """显示图像到指定标签上"""
+    def display_image(self, image, label, full_size=None):
+        """显示图像到指定标签上
+        full_size 为 image 是缩小预览时完整图像的 (宽, 高)，手动选择的角点按完整尺寸的坐标给出
+        """
         if image is None:
             return
             
@@ -399,6 +401,9 @@ class MainWindow(QMainWindow):
         
         # 保存缩放比例和偏移量到label实例
         if label == self.original_image_label:
+            if full_size is not None:
+                scale *= img_width / full_size[0]
+                img_width, img_height = full_size
             label.scale_factor = scale
             label.image_offset = (x, y)
             label.original_size = (img_width, img_height)
@@ -448,8 +453,10 @@ class MainWindow(QMainWindow):
                     cv2.imwrite(file_name, self.controller.processed_result)
                 self.show_warning("提示", "图片已保存")
 
-    def display_image(self, image, label):
-        """显示图像到指定标签上"""
+    def display_image(self, image, label, full_size=None):
+        """显示图像到指定标签上
+        full_size 为 image 是缩小预览时完整图像的 (宽, 高)，手动选择的角点按完整尺寸的坐标给出
+        """
         if image is None:
             return
             
@@ -488,6 +495,9 @@ class MainWindow(QMainWindow):
         
         # 保存缩放比例和偏移量到label实例
         if label == self.original_image_label:
+            if full_size is not None:
+                scale *= img_width / full_size[0]
+                img_width, img_height = full_size
             label.scale_factor = scale
             label.image_offset = (x, y)
             label.original_size = (img_width, img_height)
@@ -1,9 +1,79 @@
 import argparse
-import cv2
+import glob
+import json
+import os
+import time
+from .core.batch import BatchEngine, run_batch, run_task
+from .core.pipeline import ScanPipeline
 from .core.processor import ImageProcessor
+from .core.profiling import aggregate_stats
 from .core.utils import enhance_image
 
-def process_document(input_path, output_path=None, show=False, remove_shadow=False, enable_unwarp=False):
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+OUTPUT_FORMATS = ('png', 'tif', 'webp', 'jpg')  # 批量模式的输出格式，二值化结果默认用无损的 PNG
+# create_processor 的参数名 -> 命令行选项的属性名（scan_cli 与 scan_server 共用）
+PROCESSOR_OPTIONS = {
+    'remove_shadow': 'remove_shadow', 'enable_unwarp': 'unwarp', 'compiled_cache': 'jit_cache', 'int8': 'int8',
+    'reduced_decode': 'reduced_decode', 'unwarp_memory': 'unwarp_memory', 'unwarp_backend': 'unwarp_backend',
+    'shadow_method': 'shadow_method', 'binarize_engine': 'binarize_engine', 'binarize_threads': 'binarize_threads',
+    'mono_warp': 'mono', 'warp_interpolation': 'warp_interpolation', 'output_dpi': 'dpi', 'output_page': 'page',
+    'output_max_size': 'max_size', 'output_size': 'size', 'segmentation_size': 'segmentation_size',
+}
+
+
+def create_processor(remove_shadow=False, enable_unwarp=False, compiled_cache=False, int8=False,
+                     calibration_images=None, reduced_decode=False, unwarp_memory=None, unwarp_backend='torch',
+                     shadow_method='gaussian', binarize_engine='adaptive', binarize_threads=1,
+                     mono_warp=False, warp_interpolation='lanczos4', output_dpi=None, output_page='a4',
+                     output_max_size=None, output_size=None, segmentation_size=ImageProcessor.SEGMENTATION_SIZE):
+    """创建并配置处理器
+    unwarp_memory 为扭曲矫正分块重采样的临时内存上限（MB），None 时整图一次完成
+    unwarp_backend 为扭曲矫正重采样后端：'torch' 或 'remap'
+    shadow_method 为阴影去除的光照估计方法：'gaussian' 或 'pyramid'
+    binarize_engine 为局部阈值二值化方法：'adaptive'、'sauvola' 或 'niblack'
+    binarize_threads 为二值化的条带并行线程数，0 表示使用全部 CPU 核
+    mono_warp 为 True 时只对亮度通道做透视变换；warp_interpolation 为透视变换的插值方法
+    output_dpi / output_page / output_max_size / output_size 控制输出尺寸，见 ImageProcessor.output_size_for
+    segmentation_size 为分割输入尺寸，'auto' 时先用低分辨率，角点不可靠再换更高分辨率
+    """
+    processor = ImageProcessor()
+    processor.set_shadow_removal(remove_shadow)
+    processor.set_unwarp(enable_unwarp)  # 设置是否启用扭曲矫正
+    processor.use_compiled_cache = compiled_cache
+    processor.reduced_decode = reduced_decode
+    if unwarp_memory:
+        processor.unwarp_memory_budget = int(unwarp_memory * 2 ** 20)
+    processor.unwarp_backend = unwarp_backend
+    processor.shadow_method = shadow_method
+    processor.binarize_engine = binarize_engine
+    processor.binarize_threads = binarize_threads or os.cpu_count() or 1
+    processor.mono_warp = mono_warp
+    processor.warp_interpolation = warp_interpolation
+    processor.output_dpi = output_dpi
+    processor.output_page = output_page
+    processor.output_max_size = output_max_size
+    processor.output_size = output_size
+    processor.segmentation_size = segmentation_size
+    if int8:
+        processor.set_int8(True, calibration_images)
+    return processor
+
+
+def processor_settings(args, **overrides):
+    """从命令行参数收集 create_processor 的参数，命令行中没有的选项使用 create_processor 的默认值
+    Args:
+        args: argparse 解析结果，选项名见 PROCESSOR_OPTIONS
+        overrides: 额外或覆盖的设置
+    Returns:
+        create_processor 的关键字参数字典
+    """
+    settings = {name: getattr(args, option) for name, option in PROCESSOR_OPTIONS.items() if hasattr(args, option)}
+    settings.update(overrides)
+    return settings
+
+
+def process_document(input_path, output_path=None, show=False, remove_shadow=False, enable_unwarp=False,
+                     processor=None, stats_path=None, **settings):
     """处理单个文档图像
     Args:
         input_path: 输入图像路径
@@ -11,52 +81,335 @@ def process_document(input_path, output_path=None, show=False, remove_shadow=Fal
         show: 是否显示处理过程
         remove_shadow: 是否启用阴影去除
         enable_unwarp: 是否启用扭曲矫正
+        processor: 复用的处理器，为None时新建一个
+        stats_path: 各阶段耗时记录的 JSON 输出路径，为None时不记录
+        settings: 新建处理器时传给 create_processor 的其它设置
     """
     # 初始化处理器
-    processor = ImageProcessor()
-    processor.set_shadow_removal(remove_shadow)
-    processor.set_unwarp(enable_unwarp)  # 设置是否启用扭曲矫正
-    
+    if processor is None:
+        processor = create_processor(remove_shadow=remove_shadow, enable_unwarp=enable_unwarp, **settings)
+
     try:
-        result = processor.process_document(input_path)
-        
+        result = run_task(processor, 0, input_path, output_path, collect_stats=bool(stats_path))
+        if result.error is not None:
+            raise ValueError(result.error)
+
         if output_path:
-            cv2.imwrite(output_path, result)
             print(f"处理后的图像已保存到: {output_path}")
-        
+        if stats_path:
+            page = dict(result.stats, input_path=input_path)
+            write_stats(stats_path, {'stages': aggregate_stats([page]), 'pages': [page]})
+
         return True
-        
+
     except Exception as e:
         print(f"处理失败: {str(e)}")
         return False
 
+
+def collect_inputs(inputs, file_list=None):
+    """展开输入：目录、通配符、文件列表
+    Args:
+        inputs: 路径列表，可以是图像文件、目录或通配符
+        file_list: 文本文件，每行一个输入路径
+    Returns:
+        去重后的图像路径列表（保持原有顺序）
+    """
+    candidates = list(inputs)
+    if file_list:
+        with open(file_list, encoding='utf-8') as f:
+            candidates.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+
+    paths = []
+    for item in candidates:
+        if os.path.isdir(item):
+            paths.extend(sorted(
+                os.path.join(item, name) for name in os.listdir(item)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            ))
+        elif glob.has_magic(item):
+            paths.extend(sorted(p for p in glob.glob(item) if p.lower().endswith(IMAGE_EXTENSIONS)))
+        else:
+            paths.append(item)
+
+    seen = set()
+    return [p for p in paths if not (p in seen or seen.add(p))]
+
+
+def output_paths_for(input_paths, output_dir, output_format='png'):
+    """批量模式的输出路径：保留相对所有输入共同目录的子目录，扩展名换成 output_format
+    Args:
+        input_paths: 输入图像路径列表
+        output_dir: 输出目录
+        output_format: 输出格式（扩展名），见 OUTPUT_FORMATS
+    Returns:
+        (输出路径列表, 重名的输入路径列表)。换扩展名后重名（如同一目录下的 a.jpg 和 a.png）时
+        保留原扩展名（a.jpg.png），仍然重名时再加序号
+    """
+    if not input_paths:
+        return [], []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in input_paths])
+    used, output_paths, collisions = set(), [], []
+    for input_path in input_paths:
+        relative = os.path.relpath(os.path.abspath(input_path), root)
+        output_path = os.path.join(output_dir, f"{os.path.splitext(relative)[0]}.{output_format}")
+        if output_path in used:
+            collisions.append(input_path)
+            output_path = os.path.join(output_dir, f"{relative}.{output_format}")
+            count = 1
+            while output_path in used:
+                output_path = os.path.join(output_dir, f"{relative}.{count}.{output_format}")
+                count += 1
+        used.add(output_path)
+        output_paths.append(output_path)
+    return output_paths, collisions
+
+
+def report_int8_drift(calibration_images=None):
+    """在校准图像上比较 int8 与 fp32 的角点和矫正网格偏差"""
+    from .core.quantize import measure_drift
+
+    quantized = create_processor(int8=True, calibration_images=calibration_images)
+    reference = create_processor()
+    reference.device = quantized.device  # 在同一设备上比较
+    images = quantized._load_calibration_images()
+    drift = measure_drift(reference, quantized, images)
+    print(f"int8 偏差（{drift['pages']} 张图像）:")
+    if drift['corner_mean_px'] is not None:
+        print(f"  角点: 平均 {drift['corner_mean_px']:.2f} 像素，最大 {drift['corner_max_px']:.2f} 像素")
+    print(f"  角点数量不一致或检测失败: {drift['corner_mismatch']} 张")
+    if drift['grid_mean_px'] is not None:
+        print(f"  矫正网格: 平均 {drift['grid_mean_px']:.2f} 像素，最大 {drift['grid_max_px']:.2f} 像素")
+    return drift
+
+
+def print_stage_stats(stages):
+    """打印各阶段的耗时汇总"""
+    print(f"{'阶段':<24}{'次数':>6}{'总耗时(s)':>12}{'平均(ms)':>10}{'P95(ms)':>10}{'CPU(s)':>10}{'平均输出(MB)':>14}")
+    for name, stage in sorted(stages.items(), key=lambda item: -item[1]['wall_total']):
+        print(f"{name:<24}{stage['count']:>6}{stage['wall_total']:>12.3f}{stage['wall_mean'] * 1000:>10.1f}"
+              f"{stage['wall_p95'] * 1000:>10.1f}{stage['cpu_total']:>10.3f}{stage['nbytes_mean'] / 2 ** 20:>14.2f}")
+
+
+def write_stats(path, stats):
+    """将统计信息写入 JSON 文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
+
+
+def parse_size(text):
+    """解析 WxH 形式的尺寸，返回 (宽, 高)"""
+    try:
+        width, height = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"尺寸格式应为 WxH: {text}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"尺寸必须为正数: {text}")
+    return width, height
+
+
+def parse_segmentation_size(text):
+    """解析分割输入尺寸：整数或 auto"""
+    if text == 'auto':
+        return text
+    try:
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"分割输入尺寸应为整数或 auto: {text}")
+
+
+def is_batch_input(inputs):
+    """判断输入是否需要批量模式"""
+    return len(inputs) != 1 or os.path.isdir(inputs[0]) or glob.has_magic(inputs[0])
+
+
+def batch_process(input_paths, output_dir, remove_shadow=False, enable_unwarp=False, workers=1,
+                  threads_per_worker=None, batch_size=1, pipeline=False, collect_stats=False, output_format='png',
+                  **settings):
+    """批量处理文档图像，模型只加载一次（多进程时每个进程加载一次）
+    Args:
+        input_paths: 输入图像路径列表
+        output_dir: 输出目录
+        remove_shadow: 是否启用阴影去除
+        enable_unwarp: 是否启用扭曲矫正
+        workers: 工作进程数，1 表示在当前进程中处理
+        threads_per_worker: 多进程时每个进程的 torch / OpenCV 线程数（单进程时忽略）
+        batch_size: 单进程时每批合并推理的图像数（多进程时忽略）
+        pipeline: 单进程时使用流水线（解码、推理、后处理、编码并行，多进程时忽略）
+        collect_stats: 记录每张图像各阶段的耗时并汇总（逐张处理，忽略 batch_size 和 pipeline）
+        output_format: 输出格式，见 OUTPUT_FORMATS；输出保留输入相对共同目录的子目录
+        settings: 传给 create_processor 的其它设置（reduced_decode 只用于逐张处理和流水线模式）
+    Returns:
+        统计信息字典
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    processor_kwargs = dict(settings, remove_shadow=remove_shadow, enable_unwarp=enable_unwarp)
+    output_paths, collisions = output_paths_for(input_paths, output_dir, output_format)
+    for input_path, output_path in zip(input_paths, output_paths):
+        if input_path in collisions:
+            print(f"输出文件重名，{input_path} 保存为 {output_path}")
+    for directory in {os.path.dirname(p) for p in output_paths}:
+        os.makedirs(directory, exist_ok=True)
+
+    if workers > 1 and (pipeline or batch_size > 1):
+        # 多进程时每个进程逐张处理，合并推理和流水线只用于单进程
+        print("多进程时逐张处理，忽略 --batch-size 和 --pipeline")
+    if workers <= 1 and threads_per_worker:
+        print("--threads 只用于多进程（-j 大于 1），单进程时忽略")
+
+    start_time = time.perf_counter()
+    if workers > 1:
+        engine = BatchEngine(workers, threads_per_worker, create_processor, processor_kwargs).start()
+        results = engine.map(input_paths, output_paths, ordered=False, collect_stats=collect_stats)
+        print(f"启动 {engine.workers} 个工作进程，每个进程 {engine.threads_per_worker} 个线程")
+    else:
+        engine = None
+        processor = create_processor(**processor_kwargs)
+        processor.preload_models()
+        load_time = time.perf_counter() - start_time
+        print(f"模型加载耗时: {load_time:.2f} 秒")
+        tasks = [(index, input_path, output_path)
+                 for index, (input_path, output_path) in enumerate(zip(input_paths, output_paths))]
+        if collect_stats and (pipeline or batch_size > 1):
+            # 合并推理和流水线中的阶段由多张图像共享，无法归到单张图像上
+            print("记录阶段耗时时逐张处理，忽略 --batch-size 和 --pipeline")
+            pipeline, batch_size = False, 1
+        if pipeline:
+            results = ScanPipeline(processor, batch_size=batch_size).run(input_paths, output_paths)
+        elif batch_size > 1:
+            results = run_batch(processor, tasks, batch_size)
+        else:
+            results = (run_task(processor, *task, collect_stats=collect_stats) for task in tasks)
+
+    total = len(input_paths)
+    succeeded, failed, pages = 0, [], []
+    process_start = time.perf_counter()
+    try:
+        for count, result in enumerate(results, 1):
+            if result.error is None:
+                succeeded += 1
+                status = "完成"
+            else:
+                failed.append(result.input_path)
+                status = f"失败 ({result.error})"
+            print(f"[{count}/{total}] {result.input_path}: {status}, 耗时: {result.elapsed:.3f} 秒")
+            if result.stats is not None:
+                pages.append(dict(result.stats, input_path=result.input_path, error=result.error))
+    finally:
+        if engine is not None:
+            engine.close()
+    process_time = time.perf_counter() - process_start
+
+    stats = {
+        'total': total,
+        'succeeded': succeeded,
+        'failed': failed,
+        'load_time': process_start - start_time,
+        'process_time': process_time,
+        'images_per_second': total / process_time if process_time > 0 else 0.0,
+    }
+    print(f"共处理 {total} 张图像，成功 {succeeded} 张，失败 {len(failed)} 张")
+    if total:
+        print(f"总耗时: {process_time:.2f} 秒，平均每张: {process_time / total:.3f} 秒，"
+              f"吞吐量: {stats['images_per_second']:.2f} 张/秒")
+    if collect_stats:
+        stats['stages'] = aggregate_stats(pages)
+        stats['pages'] = sorted(pages, key=lambda page: page['input_path'])
+        print_stage_stats(stats['stages'])
+    return stats
+
+
 def main():
     parser = argparse.ArgumentParser(description='PureScan 文档扫描工具')
-    parser.add_argument('input', help='输入图像的路径')
+    parser.add_argument('input', nargs='*', help='输入图像的路径，可以是多个文件、目录或通配符')
     parser.add_argument('-o', '--output', help='输出图像的路径')
+    parser.add_argument('--output-dir', help='批量模式的输出目录')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='png',
+                        help='批量模式的输出格式（默认无损 PNG）；输出保留输入相对共同目录的子目录')
+    parser.add_argument('--file-list', help='包含输入图像路径的文本文件（每行一个）')
+    parser.add_argument('-j', '--workers', type=int, default=1, help='批量模式的工作进程数')
+    parser.add_argument('--threads', type=int, default=None, help='每个工作进程的 torch / OpenCV 线程数')
+    parser.add_argument('-b', '--batch-size', type=int, default=1, help='单进程批量模式下每批合并推理的图像数')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='单进程批量模式使用流水线：解码、批量推理、后处理、编码写出并行')
+    parser.add_argument('--jit-cache', action='store_true', help='使用/生成权重旁的 TorchScript 编译缓存，加快冷启动')
+    parser.add_argument('--int8', action='store_true', help='启用 int8 量化推理（仅 CPU）')
+    parser.add_argument('--calibration', nargs='+', help='int8 校准图像（文件、目录或通配符），默认使用 examples')
+    parser.add_argument('--int8-drift', action='store_true', help='报告 int8 相对 fp32 的角点和矫正网格偏差后退出')
+    parser.add_argument('--reduced-decode', action='store_true',
+                        help='JPEG 先降采样解码做边界检测，完整解码只用于透视变换（与检测并行）')
+    parser.add_argument('--unwarp-memory', type=float, metavar='MB',
+                        help='扭曲矫正按列分块重采样，限制每块的临时内存（MB），适合超大照片')
+    parser.add_argument('--unwarp-backend', choices=ImageProcessor.UNWARP_BACKENDS, default='torch',
+                        help='扭曲矫正重采样后端：torch（float grid_sample）或 remap（OpenCV 定点 remap，更快更省内存）')
+    parser.add_argument('--stats', metavar='JSON', help='记录各处理阶段的耗时、CPU 时间和输出大小，写入 JSON 文件')
     parser.add_argument('-d', '--debug', action='store_true', help='显示调试信息')
     parser.add_argument('--remove-shadow', action='store_true', help='启用阴影去除')
+    parser.add_argument('--shadow-method', choices=ImageProcessor.SHADOW_METHODS, default='gaussian',
+                        help='阴影去除的光照估计：gaussian（整图大核高斯模糊）或 pyramid（金字塔低分辨率层上估计，快得多）')
+    parser.add_argument('--binarize-engine', choices=ImageProcessor.BINARIZE_ENGINES, default='adaptive',
+                        help='局部阈值方法：adaptive（高斯加权 adaptiveThreshold）、sauvola 或 niblack'
+                             '（积分图均值方差阈值，耗时与窗口大小无关，大图更快）')
+    parser.add_argument('--binarize-threads', type=int, default=1, metavar='N',
+                        help='二值化按水平条带在 N 个线程上并行（结果与单线程相同），0 表示使用全部 CPU 核')
+    parser.add_argument('--mono', action='store_true',
+                        help='先取亮度再只对单通道做透视变换，省去约 2/3 的变换计算（二值化输出几乎不变）')
+    parser.add_argument('--warp-interpolation', choices=list(ImageProcessor.WARP_INTERPOLATIONS), default='lanczos4',
+                        help='透视变换的插值方法，输出只用于二值化时 cubic / linear 更快')
+    parser.add_argument('--dpi', type=float, help='按纸张规格和该 DPI 输出，透视变换 / 扭曲矫正直接采样到这个尺寸')
+    parser.add_argument('--page', choices=list(ImageProcessor.PAGE_SIZES_MM), default='a4', help='--dpi 使用的纸张规格')
+    parser.add_argument('--max-size', type=int, metavar='PIXELS', help='输出长边上限（只缩小不放大）')
+    parser.add_argument('--size', type=parse_size, metavar='WxH', help='固定输出尺寸，如 2480x3508')
+    parser.add_argument('--segmentation-size', type=parse_segmentation_size,
+                        choices=ImageProcessor.SEGMENTATION_SIZES + ('auto',), default=ImageProcessor.SEGMENTATION_SIZE,
+                        help='边界检测的分割输入尺寸；auto 先用低分辨率，四边形不可靠（非凸、顶点数不对、面积太小）时再提高')
     parser.add_argument('--unwarp', action='store_true', help='启用扭曲矫正（不进行边界检测）')
-    
+
     args = parser.parse_args()
-    
+    calibration_images = collect_inputs(args.calibration) if args.calibration else None
+
+    if args.int8_drift:
+        report_int8_drift(calibration_images)
+        return 0
+
+    if not args.input and not args.file_list:
+        parser.error('需要至少一个输入')
+
+    settings = processor_settings(args, calibration_images=calibration_images)
+
+    if args.output_dir or args.file_list or is_batch_input(args.input):
+        if not args.output_dir:
+            parser.error('批量模式需要指定 --output-dir')
+        input_paths = collect_inputs(args.input, args.file_list)
+        if args.debug:
+            print(f"批量处理 {len(input_paths)} 张图像，输出目录: {args.output_dir}")
+        stats = batch_process(
+            input_paths,
+            args.output_dir,
+            workers=args.workers,
+            threads_per_worker=args.threads,
+            batch_size=args.batch_size,
+            pipeline=args.pipeline,
+            collect_stats=bool(args.stats),
+            output_format=args.output_format,
+            **settings
+        )
+        if args.stats:
+            write_stats(args.stats, stats)
+        return 1 if stats['failed'] else 0
+
     if args.debug:
-        print(f"处理图像: {args.input}")
+        print(f"处理图像: {args.input[0]}")
         if args.output:
             print(f"输出路径: {args.output}")
-    
+
     # 处理图像
-    success = process_document(
-        args.input, 
-        args.output,
-        remove_shadow=args.remove_shadow,
-        enable_unwarp=args.unwarp
-    )
-    
+    success = process_document(args.input[0], args.output, stats_path=args.stats, **settings)
+
     if not success:
         print("处理失败")
         return 1
     return 0
 
 if __name__ == "__main__":
-    exit(main())
\ No newline at end of file
+    exit(main())
@@ -0,0 +1,328 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+
+import cv2
+import numpy as np
+
+from .core.processor import ImageProcessor
+from .scan_cli import create_processor, parse_segmentation_size, processor_settings
+
+MAX_BODY_SIZE = 64 * 1024 * 1024  # 单个请求体上限
+STREAM_CHUNK_SIZE = 64 * 1024  # 响应分块写出的大小
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error'}
+OUTPUT_EXTENSIONS = {'png': '.png', 'jpg': '.jpg', 'jpeg': '.jpg'}  # format 查询参数可选的输出格式
+
+
+class PayloadTooLarge(Exception):
+    """请求体超过 MAX_BODY_SIZE"""
+
+
+class BadRequest(Exception):
+    """请求行或请求头格式错误"""
+
+
+class MicroBatcher:
+    """把并发请求合并成小批次调用批量推理函数
+
+    第一张图像到达后最多再等待 max_wait 秒，或凑满 max_batch_size 张后立即推理。
+    推理在单独的线程中串行执行，事件循环不会被阻塞。
+
+    Args:
+        infer: 批量推理函数，输入图像列表，返回等长的结果列表
+        executor: 执行推理的线程池（建议单线程，模型不需要并发调用）
+        max_batch_size: 每批最多的图像数
+        max_wait: 凑批的最长等待秒数
+    """
+
+    def __init__(self, infer, executor, max_batch_size=8, max_wait=0.01):
+        self.infer = infer
+        self.executor = executor
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batch_count = 0
+        self.batch_sizes = deque(maxlen=1000)  # 最近的批次大小
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, image):
+        """提交一张图像，等待所在批次的推理结果"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((image, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.batch_count += 1
+            self.batch_sizes.append(len(batch))
+            images = [image for image, _ in batch]
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.infer, images)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+
+class ScanServer:
+    """本地 HTTP 扫描服务
+
+    模型常驻内存，POST /scan 的请求体为 JPEG/PNG 图像，返回二值化后的编码图像。
+    查询参数：unwarp=0/1 是否扭曲矫正，shadow=0/1 是否去除阴影，format=png/jpg 输出格式（其它值返回 400）。
+    GET /health 返回服务状态和最近的批次大小统计。
+
+    Args:
+        processor: 已配置的 ImageProcessor
+        max_batch_size: 微批次最大图像数
+        max_wait: 微批次最长等待秒数
+        workers: 解码、后处理、编码线程数
+    """
+
+    def __init__(self, processor, max_batch_size=8, max_wait=0.01, workers=4):
+        self.processor = processor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.cpu_executor = ThreadPoolExecutor(workers, thread_name_prefix='scan-cpu')
+        self.model_executor = ThreadPoolExecutor(1, thread_name_prefix='scan-model')
+        self.detect_batcher = None
+        self.unwarp_batcher = None
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """启动服务，返回 asyncio.Server"""
+        # 每个微批次只做一次前向推理，不再按 DETECT_BATCH_SIZE / UNWARP_BATCH_SIZE 拆分
+        self.detect_batcher = MicroBatcher(partial(self.processor.detect_documents, batch_size=self.max_batch_size),
+                                           self.model_executor, self.max_batch_size, self.max_wait)
+        self.unwarp_batcher = MicroBatcher(partial(self.processor.unwarp_documents, batch_size=self.max_batch_size),
+                                           self.model_executor, self.max_batch_size, self.max_wait)
+        self.detect_batcher.start()
+        self.unwarp_batcher.start()
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def stop(self):
+        await self.detect_batcher.stop()
+        await self.unwarp_batcher.stop()
+        self.cpu_executor.shutdown()
+        self.model_executor.shutdown()
+
+    async def handle_connection(self, reader, writer):
+        """处理一个连接上的请求（支持 keep-alive）"""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except PayloadTooLarge:
+                    await self._write_response(writer, *self._error(413, '请求体过大'), keep_alive=False)
+                    break
+                except BadRequest as e:
+                    # 请求边界已经无法确定，返回错误后关闭连接
+                    await self._write_response(writer, *self._error(400, str(e)), keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, content_type, payload = await self.dispatch(method, target, body)
+                except Exception as e:
+                    status, content_type, payload = self._error(500, str(e))
+                await self._write_response(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == '/health':
+            return 200, 'application/json', json.dumps(self.health()).encode()
+        if url.path != '/scan':
+            return self._error(404, '未知路径')
+        if method != 'POST':
+            return self._error(405, '仅支持 POST')
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        enable_unwarp = self._flag(params.get('unwarp'), self.processor.enable_unwarp)
+        remove_shadow = self._flag(params.get('shadow'), self.processor.remove_shadow)
+        ext = OUTPUT_EXTENSIONS.get(params.get('format', 'png').lower())
+        if ext is None:
+            return self._error(400, f"不支持的输出格式: {params['format']}")
+
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(self.cpu_executor, self._decode, body)
+        if image is None:
+            return self._error(400, '无法解码图像')
+
+        if enable_unwarp:
+            unwarped = await self.unwarp_batcher.submit(image)
+            binary = await loop.run_in_executor(self.cpu_executor, self.processor.binarize, unwarped,
+                                                remove_shadow)
+        else:
+            corners = await self.detect_batcher.submit(image)
+            if corners is None:
+                return self._error(422, 'Cannot detect document boundaries')
+            binary = await loop.run_in_executor(self.cpu_executor, self._postprocess, image, corners,
+                                                remove_shadow)
+
+        ok, encoded = await loop.run_in_executor(self.cpu_executor, cv2.imencode, ext, binary)
+        if not ok:
+            return self._error(500, '无法编码图像')
+        return 200, 'image/jpeg' if ext == '.jpg' else 'image/png', encoded.tobytes()
+
+    def health(self):
+        sizes = list(self.detect_batcher.batch_sizes) + list(self.unwarp_batcher.batch_sizes)
+        return {
+            'status': 'ok',
+            'batches': self.detect_batcher.batch_count + self.unwarp_batcher.batch_count,
+            'mean_batch_size': float(np.mean(sizes)) if sizes else 0.0,
+        }
+
+    def _postprocess(self, image, corners, remove_shadow):
+        transformed = self.processor.perspective_transform(image, corners)
+        return self.processor.binarize(transformed, remove_shadow)
+
+    @staticmethod
+    def _decode(body):
+        return cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    @staticmethod
+    def _flag(value, default):
+        if value is None:
+            return default
+        return value.lower() in ('1', 'true', 'yes', 'on')
+
+    @staticmethod
+    def _error(status, message):
+        return status, 'application/json', json.dumps({'error': message}, ensure_ascii=False).encode()
+
+    @staticmethod
+    async def _read_request(reader):
+        """读取一个 HTTP/1.1 请求，连接关闭时返回 None，请求行或 Content-Length 格式错误时抛出 BadRequest"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise BadRequest('请求行格式错误')
+        method, target, _ = parts
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = headers.get('content-length', '0')
+        if not (length.isascii() and length.isdigit()):
+            raise BadRequest(f"Content-Length 格式错误: {length}")
+        length = int(length)
+        if length > MAX_BODY_SIZE:
+            raise PayloadTooLarge()
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+
+    @staticmethod
+    async def _write_response(writer, status, content_type, payload, keep_alive):
+        """写出响应头后按块写出响应体，每块之后等待缓冲区排空"""
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1'))
+        view = memoryview(payload)
+        for start in range(0, len(view), STREAM_CHUNK_SIZE):
+            writer.write(view[start:start + STREAM_CHUNK_SIZE])
+            await writer.drain()
+        await writer.drain()
+
+
+async def serve(args):
+    processor = create_processor(**processor_settings(args))
+    # 默认流程的模型预先加载，另一种流程的模型在第一次请求时加载
+    processor.preload_models()
+    server = ScanServer(processor, args.max_batch, args.max_wait_ms / 1000, args.workers)
+    tcp_server = await server.start(args.host, args.port)
+    print(f"PureScan 服务已启动: http://{args.host}:{args.port}/scan "
+          f"(最大批次 {args.max_batch}，最长等待 {args.max_wait_ms} ms)")
+    try:
+        async with tcp_server:
+            await tcp_server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PureScan 本地扫描服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认仅本机）')
+    parser.add_argument('--port', type=int, default=8000, help='监听端口')
+    parser.add_argument('--max-batch', type=int, default=8, help='微批次最大图像数')
+    parser.add_argument('--max-wait-ms', type=float, default=10, help='微批次最长等待毫秒数')
+    parser.add_argument('--workers', type=int, default=4, help='解码、后处理、编码线程数')
+    parser.add_argument('--remove-shadow', action='store_true', help='默认启用阴影去除')
+    parser.add_argument('--unwarp', action='store_true', help='默认启用扭曲矫正')
+    parser.add_argument('--jit-cache', action='store_true', help='使用 TorchScript 编译缓存')
+    parser.add_argument('--int8', action='store_true', help='启用 int8 量化推理（仅 CPU）')
+    parser.add_argument('--unwarp-backend', choices=ImageProcessor.UNWARP_BACKENDS, default='torch',
+                        help='扭曲矫正重采样后端')
+    parser.add_argument('--shadow-method', choices=ImageProcessor.SHADOW_METHODS, default='gaussian',
+                        help='阴影去除的光照估计方法')
+    parser.add_argument('--binarize-engine', choices=ImageProcessor.BINARIZE_ENGINES, default='adaptive',
+                        help='局部阈值二值化方法')
+    parser.add_argument('--mono', action='store_true', help='只对亮度通道做透视变换')
+    parser.add_argument('--warp-interpolation', choices=list(ImageProcessor.WARP_INTERPOLATIONS), default='lanczos4',
+                        help='透视变换的插值方法')
+    parser.add_argument('--dpi', type=float, help='按纸张规格和该 DPI 输出')
+    parser.add_argument('--page', choices=list(ImageProcessor.PAGE_SIZES_MM), default='a4', help='--dpi 使用的纸张规格')
+    parser.add_argument('--max-size', type=int, help='输出长边上限（像素）')
+    parser.add_argument('--binarize-threads', type=int, default=1, help='单张图像二值化的条带并行线程数，0 表示全部 CPU 核')
+    parser.add_argument('--segmentation-size', type=parse_segmentation_size,
+                        choices=ImageProcessor.SEGMENTATION_SIZES + ('auto',),
+                        default=ImageProcessor.SEGMENTATION_SIZE,
+                        help='边界检测的分割输入尺寸，auto 先用低分辨率、四边形不可靠时再提高')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
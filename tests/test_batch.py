@@ -0,0 +1,88 @@
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.core.batch import BatchEngine, run_batch, run_task
+from src.core.processor import ImageProcessor
+from test_detect import BrightnessModel
+from test_pipeline import FailingWarpProcessor, write_inputs
+
+
+def brightness_processor(**settings):
+    """工作进程中创建的处理器：用 BrightnessModel 代替分割模型，宽度为 1000 的图像透视变换失败"""
+    processor = FailingWarpProcessor()
+    processor.model = BrightnessModel()
+    for name, value in settings.items():
+        setattr(processor, name, value)
+    return processor
+
+
+def worker_threads():
+    return torch.get_num_threads(), cv2.getNumThreads()
+
+
+def check_results(results, expected):
+    assert sorted(result.index for result in results) == list(range(len(expected)))
+    for result in results:
+        serial = expected[result.index]
+        assert result.input_path == serial.input_path
+        assert result.error == serial.error, result.input_path
+        if serial.error is None:
+            assert np.array_equal(result.image, serial.image), result.input_path
+        else:
+            assert result.image is None
+
+
+def test_batch_engine_matches_serial():
+    settings = {'binarize_engine': 'sauvola'}
+    processor = brightness_processor(**settings)
+    with tempfile.TemporaryDirectory() as tmp:
+        input_paths = write_inputs(Path(tmp))
+        expected = [run_task(processor, index, path) for index, path in enumerate(input_paths)]
+        assert expected[4].error == "Cannot load image" and expected[-1].error == "warp failed"
+
+        with BatchEngine(workers=2, threads_per_worker=2, processor_factory=brightness_processor,
+                         processor_kwargs=settings) as engine:
+            # 每个工作进程在初始化时设置线程数
+            assert engine._pool.apply(worker_threads) == (2, 2)
+
+            ordered = list(engine.map(input_paths))
+            assert [result.index for result in ordered] == list(range(len(input_paths)))
+            check_results(ordered, expected)
+
+            # 工作进程中的异常记录在结果里，不会中断其它任务
+            unordered = list(engine.map(input_paths, ordered=False, collect_stats=True))
+            check_results(unordered, expected)
+            for result in unordered:
+                assert result.stats is not None and result.stats['stages'][0]['name'] == 'imread'
+
+
+def test_run_batch_matches_serial():
+    processor = ImageProcessor()
+    processor.model = BrightnessModel()
+    with tempfile.TemporaryDirectory() as tmp:
+        input_paths = write_inputs(Path(tmp))
+        expected = [run_task(processor, index, path) for index, path in enumerate(input_paths)]
+        tasks = [(index, path, None) for index, path in enumerate(input_paths)]
+        for batch_size in (1, 3, len(tasks)):
+            results = list(run_batch(processor, tasks, batch_size))
+            assert [result.index for result in results] == list(range(len(tasks)))
+            check_results(results, expected)
+
+
+def main():
+    test_batch_engine_matches_serial()
+    test_run_batch_matches_serial()
+    print("多进程和合并推理的批量结果与逐张处理相同")
+
+
+if __name__ == "__main__":
+    main()
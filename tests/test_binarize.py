@@ -0,0 +1,122 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.core.processor import ImageProcessor
+
+
+def load_page(name='shadow.jpg', long_edge=2000):
+    """读取示例图像并缩小，控制测试耗时"""
+    image = cv2.imread(str(project_root / 'examples' / name))
+    scale = long_edge / max(image.shape[:2])
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def test_pyramid_illumination_matches():
+    processor = ImageProcessor()
+    page = load_page()
+    gray = cv2.cvtColor(page, cv2.COLOR_BGR2LAB)[:, :, 0].astype(np.float32)
+    kernel_size = int((min(gray.shape) // 20) * 3) | 1
+
+    expected = processor._estimate_illumination(gray, kernel_size)
+    processor.shadow_method = 'pyramid'
+    actual = processor._estimate_illumination(gray, kernel_size)
+    diff = np.abs(expected - actual)
+    print(f"光照估计差异: 平均 {diff.mean():.3f}，最大 {diff.max():.3f} 灰度级")
+    assert diff.max() < 1.0
+
+    processor.shadow_method = 'gaussian'
+    expected = processor.binarize(page, remove_shadow=True)
+    processor.shadow_method = 'pyramid'
+    actual = processor.binarize(page, remove_shadow=True)
+    agreement = (expected == actual).mean()
+    print(f"阴影去除二值化一致率: {agreement:.5f}")
+    assert agreement > 0.999
+
+
+def box_threshold(processor, gray, block_size):
+    """用 boxFilter 直接计算窗口均值和标准差的参照实现"""
+    gray = gray.astype(np.float64)
+    mean = cv2.boxFilter(gray, -1, (block_size, block_size), borderType=cv2.BORDER_REPLICATE)
+    sqmean = cv2.sqrBoxFilter(gray, -1, (block_size, block_size), borderType=cv2.BORDER_REPLICATE)
+    std = np.sqrt(np.maximum(sqmean - mean * mean, 0))
+    if processor.binarize_engine == 'sauvola':
+        threshold = mean * (1 + processor.SAUVOLA_K * (std / processor.SAUVOLA_R - 1))
+    else:
+        threshold = mean + processor.NIBLACK_K * std - processor.NIBLACK_C
+    return np.where(gray > threshold, 255, 0).astype(np.uint8)
+
+
+def test_integral_threshold_matches():
+    processor = ImageProcessor()
+    page = load_page('doc3.jpg', long_edge=1500)
+    gray = cv2.cvtColor(page, cv2.COLOR_BGR2LAB)[:, :, 0]
+    # 较小的分块行数，覆盖多个行块的拼接
+    processor.INTEGRAL_BAND_ROWS = 100
+    for engine in ('sauvola', 'niblack'):
+        processor.binarize_engine = engine
+        for block_size in (11, 51, 151):
+            actual = processor._integral_threshold(gray, block_size)
+            expected = box_threshold(processor, gray, block_size)
+            # 只有阈值恰好落在像素值附近时，float32 与 float64 的舍入会不同
+            assert (actual == expected).mean() > 0.9999, f"{engine}，窗口 {block_size}"
+
+    processor.binarize_engine = 'adaptive'
+    expected = processor.binarize(page)
+    processor.binarize_engine = 'niblack'
+    actual = processor.binarize(page)
+    agreement = (expected == actual).mean()
+    print(f"Niblack 与 adaptiveThreshold 二值化一致率: {agreement:.5f}")
+    assert agreement > 0.98
+
+
+def test_strip_binarize_matches():
+    processor = ImageProcessor()
+    # 800 行覆盖双边滤波，2000 行覆盖 2x2 闭运算
+    for long_edge in (800, 2000):
+        page = load_page('doc3.jpg', long_edge)
+        for engine in ('adaptive', 'niblack'):
+            for remove_shadow, shadow_method in ((False, 'gaussian'), (True, 'gaussian'), (True, 'pyramid')):
+                processor.binarize_engine = engine
+                processor.shadow_method = shadow_method
+                processor.binarize_threads = 1
+                expected = processor.binarize(page, remove_shadow)
+                for threads in (2, 3):
+                    processor.binarize_threads = threads
+                    actual = processor.binarize(page, remove_shadow)
+                    assert np.array_equal(expected, actual), \
+                        f"{long_edge} 像素，{engine}，阴影 {remove_shadow}/{shadow_method}，{threads} 线程"
+
+
+def test_mono_warp_close():
+    processor = ImageProcessor()
+    page = load_page('doc3.jpg', long_edge=1500)
+    height, width = page.shape[:2]
+    # 第二组角点超出图像边界，覆盖扩展边界的路径
+    for corners in ([[60, 40], [width - 50, 70], [width - 30, height - 60], [40, height - 30]],
+                    [[-40, -30], [width + 20, 10], [width - 10, height + 25], [15, height - 5]]):
+        corners = np.float32(corners)
+        color = processor.perspective_transform(page, corners.copy())
+        mono = processor.perspective_transform(page, corners.copy(), mono=True)
+        assert mono.shape == color.shape[:2]
+        agreement = (processor.binarize(color) == processor.binarize(mono)).mean()
+        print(f"单通道透视变换二值化一致率: {agreement:.5f}")
+        assert agreement > 0.998
+
+
+def main():
+    test_pyramid_illumination_matches()
+    test_integral_threshold_matches()
+    test_strip_binarize_matches()
+    print("条带并行二值化结果与整页处理一致")
+    test_mono_warp_close()
+
+
+if __name__ == "__main__":
+    main()
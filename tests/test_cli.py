@@ -0,0 +1,63 @@
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.scan_cli import create_processor, output_paths_for, processor_settings
+
+
+def test_output_paths():
+    # 不同目录下的同名文件保留子目录，不会互相覆盖
+    inputs = ['scans/a/page.jpg', 'scans/b/page.jpg', 'scans/a/other.jpeg']
+    outputs, collisions = output_paths_for(inputs, 'out')
+    assert outputs == [os.path.join('out', 'a', 'page.png'), os.path.join('out', 'b', 'page.png'),
+                       os.path.join('out', 'a', 'other.png')]
+    assert collisions == []
+
+    # 同一目录下只差扩展名的文件换成 PNG 后重名，保留原扩展名并报告
+    outputs, collisions = output_paths_for(['scans/page.jpg', 'scans/page.png'], 'out')
+    assert outputs == [os.path.join('out', 'page.png'), os.path.join('out', 'page.png.png')]
+    assert collisions == ['scans/page.png']
+
+    outputs, _ = output_paths_for(['scans/page.png'], 'out', 'jpg')
+    assert outputs == [os.path.join('out', 'page.jpg')]
+
+
+def test_processor_settings():
+    # 命令行选项按名字映射到 create_processor 的参数，缺少的选项（如服务端没有的）用默认值
+    args = argparse.Namespace(unwarp=True, mono=True, dpi=300.0, page='a5', size=None, segmentation_size='auto',
+                              binarize_threads=2, workers=4)
+    settings = processor_settings(args, calibration_images=['calib.jpg'])
+    assert settings == {'enable_unwarp': True, 'mono_warp': True, 'output_dpi': 300.0, 'output_page': 'a5',
+                        'output_size': None, 'segmentation_size': 'auto', 'binarize_threads': 2,
+                        'calibration_images': ['calib.jpg']}
+    processor = create_processor(**settings)
+    assert processor.enable_unwarp and processor.mono_warp
+    assert (processor.output_dpi, processor.output_page, processor.segmentation_size) == (300.0, 'a5', 'auto')
+    assert processor.binarize_threads == 2 and processor.binarize_engine == 'adaptive'
+
+
+def test_lazy_imports():
+    # 导入命令行模块不加载 torch 和 GUI，--help、参数错误等路径不需要等待
+    code = ("import sys; import src.scan_cli; "
+            "print(','.join(name for name in ('torch', 'torchvision', 'PyQt6') if name in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=project_root, capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.strip() == '', result.stdout
+
+
+def main():
+    test_output_paths()
+    print("批量模式的输出路径不重名")
+    test_processor_settings()
+    test_lazy_imports()
+    print("导入命令行模块时不加载 torch 和 PyQt6")
+
+
+if __name__ == "__main__":
+    main()
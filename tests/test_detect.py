@@ -0,0 +1,134 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.core.processor import ImageProcessor
+
+
+class BrightnessModel(torch.nn.Module):
+    """代替分割模型（不需要权重）：比平均亮度亮的区域判为文档，并记录每次推理的输入尺寸"""
+
+    def __init__(self):
+        super().__init__()
+        self.sizes = []
+
+    def forward(self, x):
+        self.sizes.append(x.shape[-1])
+        brightness = x.mean(dim=1, keepdim=True)
+        return {'out': torch.cat([-brightness, brightness], dim=1)}
+
+
+def page_photo(corners, size=(1200, 900)):
+    """深色背景上的白色页面"""
+    image = np.full((size[1], size[0], 3), 40, np.uint8)
+    cv2.fillPoly(image, [np.int32(corners)], (235, 235, 235))
+    return image
+
+
+def test_segmentation_sizes():
+    processor = ImageProcessor()
+    processor.model = BrightnessModel()
+    corners = np.float32([[150, 100], [1050, 140], [1000, 820], [120, 780]])
+    image = page_photo(corners)
+    for size in ImageProcessor.SEGMENTATION_SIZES:
+        processor.segmentation_size = size
+        for quad_method in ImageProcessor.QUAD_METHODS:
+            processor.quad_method = quad_method
+            detected = processor.detect_document(image)
+            assert processor.model.sizes[-1] == size
+            assert len(detected) == 4
+            # 角点落在掩码边缘外几个像素（按掩码像素换算到原图）
+            error = np.linalg.norm(detected[None] - corners[:, None], axis=2).min(axis=1).max()
+            assert error < 5 * 1200 / size, f"{size}，{quad_method}：角点误差 {error:.1f}"
+
+
+def test_auto_segmentation_size():
+    processor = ImageProcessor()
+    processor.model = BrightnessModel()
+    processor.segmentation_size = 'auto'
+    low, high = ImageProcessor.SEGMENTATION_CASCADE
+    clean = page_photo([[150, 100], [1050, 140], [1000, 820], [120, 780]])
+    small = page_photo([[500, 400], [700, 400], [700, 560], [500, 560]])
+    empty = np.full((900, 1200, 3), 40, np.uint8)
+
+    # 只有面积太小和没有边界的图像用更高分辨率再检测一次
+    results = processor.detect_documents([clean, small, empty, clean])
+    assert processor.model.sizes == [low, high]
+    assert processor._is_good_quad(results[0], clean.shape[:2])
+    assert len(results[1]) == 4 and results[2] is None
+
+    processor.model.sizes.clear()
+    processor.detect_documents([clean, clean])
+    assert processor.model.sizes == [low]
+
+
+def test_batched_detection_matches():
+    processor = ImageProcessor()
+    processor.model = BrightnessModel()
+    pages = [page_photo([[150, 100], [1050, 140], [1000, 820], [120, 780]]),
+             page_photo([[100, 80], [900, 100], [880, 700], [120, 680]], size=(1000, 800)),
+             page_photo([[500, 400], [700, 400], [700, 560], [500, 560]]),
+             page_photo([[80, 120], [700, 90], [740, 1000], [60, 1050]], size=(800, 1100)),
+             np.full((900, 1200, 3), 40, np.uint8)]
+    # 不同尺寸的图像合并推理，结果与逐张检测相同；auto 模式只把部分图像送入第二级
+    for segmentation_size in (ImageProcessor.SEGMENTATION_SIZE, 'auto'):
+        processor.segmentation_size = segmentation_size
+        expected = [processor.detect_document(page) for page in pages]
+        for batch_size in (2, len(pages)):
+            actual = processor.detect_documents(pages, batch_size)
+            for single, batched in zip(expected, actual):
+                assert (single is None) == (batched is None)
+                if single is not None:
+                    assert np.array_equal(single, batched), f"{segmentation_size}，批大小 {batch_size}"
+
+
+def test_reduced_decode_corners():
+    processor = ImageProcessor()
+    processor.model = BrightnessModel()
+    processor.reduced_decode = True
+    for path in sorted((project_root / 'examples').glob('*.jpg')):
+        full = cv2.imread(str(path))
+        extent = processor._detection_extent(full.shape, processor.SEGMENTATION_SIZE)
+        factor = processor._block_factor(full.shape, processor.SEGMENTATION_SIZE)
+        # 块平均得到的缩小图与完整图像的分割输入完全相同，角点只差按比例换算的 float32 舍入
+        small = cv2.resize(full[:extent[0], :extent[1]], (extent[1] // factor, extent[0] // factor),
+                           interpolation=cv2.INTER_AREA)
+        expected = processor.detect_document(full)
+        actual = processor.scale_corners(processor.detect_document(small), small.shape, extent)
+        assert np.allclose(actual, expected, rtol=1e-5, atol=1e-3), path.name
+
+        # JPEG 降采样解码只近似块平均，角点数量相同，偏差只打印
+        reduced = processor.load_detection_image(str(path))
+        decoded = processor.scale_corners(processor.detect_document(reduced), reduced.shape, full.shape)
+        assert len(decoded) == len(expected), path.name
+        deviation = np.linalg.norm(decoded[None] - expected[:, None], axis=2).min(axis=1).max()
+        print(f"{path.name}: JPEG 降采样解码角点偏差 {deviation:.1f} 像素")
+
+
+def test_default_detection_input():
+    # 不开启 reduced_decode 时分割输入仍是最近邻缩放，与原来的检测结果相同
+    processor = ImageProcessor()
+    image = cv2.imread(str(project_root / 'examples' / 'doc1_low.jpg'))
+    expected = processor.transformer(cv2.resize(image, (384, 384), interpolation=cv2.INTER_NEAREST))
+    assert np.array_equal(processor._prepare_detection_input(image).numpy(), expected.numpy())
+    assert processor._detection_extent(image.shape, 384) == image.shape[:2]
+
+
+def main():
+    test_segmentation_sizes()
+    test_auto_segmentation_size()
+    test_batched_detection_matches()
+    test_reduced_decode_corners()
+    test_default_detection_input()
+    print("各分割输入尺寸的角点检测正常，自动模式只对不可靠的图像提高分辨率")
+
+
+if __name__ == "__main__":
+    main()
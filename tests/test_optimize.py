@@ -0,0 +1,144 @@
+import importlib
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+import torch
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from torchvision.models.segmentation import deeplabv3_mobilenet_v3_large
+
+from src.core.model import UVDocnet
+from src.core.optimize import compiled_model_path, file_digest, load_compiled_model, optimize_for_inference
+
+
+def randomize_batchnorm(model):
+    """随机化 BN 的统计量和仿射参数，使折叠前后的差异能被检测到"""
+    torch.manual_seed(0)
+    for module in model.modules():
+        if isinstance(module, torch.nn.BatchNorm2d):
+            module.running_mean.uniform_(-0.5, 0.5)
+            module.running_var.uniform_(0.5, 2.0)
+            module.weight.data.uniform_(0.5, 1.5)
+            module.bias.data.uniform_(-0.5, 0.5)
+    return model.eval()
+
+
+def count_batchnorm(model):
+    return sum(isinstance(m, torch.nn.BatchNorm2d) for m in model.modules())
+
+
+def test_fused_uvdocnet_matches():
+    model = randomize_batchnorm(UVDocnet(num_filter=32, kernel_size=5))
+    inp = torch.rand(1, 3, 712, 488)
+    with torch.no_grad():
+        expected = model(inp)[0]
+        optimize_for_inference(model)
+        actual = model(inp)[0]
+
+    assert count_batchnorm(model) == 0
+    max_diff = (expected - actual).abs().max().item()
+    print(f"UVDocnet 最大误差: {max_diff:.2e}")
+    assert torch.allclose(expected, actual, rtol=1e-3, atol=1e-4)
+
+
+def test_fused_deeplab_matches():
+    model = randomize_batchnorm(deeplabv3_mobilenet_v3_large(num_classes=2, weights_backbone=None))
+    inp = torch.rand(2, 3, 384, 384)
+    with torch.no_grad():
+        expected = model(inp)["out"]
+        optimize_for_inference(model)
+        actual = model(inp)["out"]
+
+    assert count_batchnorm(model) == 0
+    max_diff = (expected - actual).abs().max().item()
+    print(f"DeepLabV3 最大误差: {max_diff:.2e}")
+    assert torch.allclose(expected, actual, rtol=1e-3, atol=1e-4)
+    assert torch.equal(expected.argmax(dim=1), actual.argmax(dim=1))
+
+
+def test_int8_settings():
+    from src.core import quantize
+    from src.core.processor import ImageProcessor
+
+    # 导入量化模块不修改全局的警告设置
+    filters = list(warnings.filters)
+    importlib.reload(quantize)
+    assert warnings.filters == filters
+
+    # 关闭 int8 后按是否有 CUDA 重新选择设备，不固定在 CPU 上
+    processor = ImageProcessor()
+    processor.set_int8(True)
+    assert processor.device.type == 'cpu'
+    processor.set_int8(False)
+    assert processor._device is None
+    assert processor.device.type == ('cuda' if torch.cuda.is_available() else 'cpu')
+
+
+def test_compiled_cache():
+    device = torch.device('cpu')
+    torch.manual_seed(0)
+    reference = randomize_batchnorm(torch.nn.Sequential(
+        torch.nn.Conv2d(3, 8, 3, padding=1), torch.nn.BatchNorm2d(8), torch.nn.ReLU(), torch.nn.Conv2d(8, 2, 1)))
+    inp = torch.rand(1, 3, 32, 32)
+    with torch.no_grad():
+        expected = reference(inp)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        weights_path = str(Path(tmp) / 'model.pth')
+        torch.save(reference.state_dict(), weights_path)
+        builds = []
+
+        def build_model():
+            builds.append(1)
+            model = torch.nn.Sequential(
+                torch.nn.Conv2d(3, 8, 3, padding=1), torch.nn.BatchNorm2d(8), torch.nn.ReLU(), torch.nn.Conv2d(8, 2, 1))
+            model.load_state_dict(torch.load(weights_path, map_location=device))
+            return model.to(device)
+
+        def check(model):
+            with torch.no_grad():
+                assert torch.allclose(model(inp), expected, atol=1e-5)
+
+        # 缓存文件名包含权重的 sha256、torch 版本和设备类型
+        cache_path = compiled_model_path(weights_path, 'seg', device)
+        assert Path(cache_path).name == (f"model.pth.seg.{file_digest(weights_path)[:16]}"
+                                         f".torch{torch.__version__.replace('+', '_')}.cpu.ts")
+
+        # 第一次编译并写入缓存，之后直接加载，不再构建 eager 模型
+        check(load_compiled_model(weights_path, 'seg', build_model, device))
+        assert Path(cache_path).exists() and len(builds) == 1
+        check(load_compiled_model(weights_path, 'seg', build_model, device))
+        assert len(builds) == 1
+
+        # 缓存损坏或被截断时给出警告，重新编译并覆盖缓存
+        contents = Path(cache_path).read_bytes()
+        for damaged in (b'not a torchscript archive', contents[:len(contents) // 2]):
+            Path(cache_path).write_bytes(damaged)
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                check(load_compiled_model(weights_path, 'seg', build_model, device))
+            assert any("编译缓存损坏" in str(warning.message) for warning in caught)
+            check(load_compiled_model(weights_path, 'seg', build_model, device))
+        assert len(builds) == 3
+
+        # 权重改变后使用新的缓存文件
+        torch.save({name: value + 1 for name, value in reference.state_dict().items()}, weights_path)
+        assert compiled_model_path(weights_path, 'seg', device) != cache_path
+        assert not list(Path(tmp).glob('*.tmp'))
+
+
+def main():
+    test_fused_uvdocnet_matches()
+    test_fused_deeplab_matches()
+    test_int8_settings()
+    test_compiled_cache()
+    print("卷积-BN 折叠结果与原模型一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.core.processor import ImageProcessor
+from src.core.view import ImageView
+
+
+def test_offframe_warp_matches():
+    processor = ImageProcessor()
+    image = cv2.imread(str(project_root / 'examples' / 'doc3_very_low.jpg'))
+    height, width = image.shape[:2]
+    frame = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        # 每个角点在图像边界附近随机偏移，大部分情况至少有一个角点超出图像
+        corners = (frame + rng.uniform(-0.15, 0.15, (4, 2)) * (width, height)).astype(np.float32)
+        original = corners.copy()
+        # 后两组缩小输出，覆盖先建金字塔再采样的路径
+        for settings in ({}, {'output_max_size': 150}, {'output_dpi': 20}):
+            for name, value in settings.items():
+                setattr(processor, name, value)
+            for mono in (False, True):
+                processor.copy_padding = True
+                expected = processor.perspective_transform(image, corners, mono=mono)
+                processor.copy_padding = False
+                actual = processor.perspective_transform(image, corners, mono=mono)
+                assert np.array_equal(expected, actual), f"{settings}，单通道 {mono}"
+            for name in settings:
+                setattr(processor, name, None)
+        assert np.array_equal(corners, original), "透视变换不应修改传入的角点"
+
+
+def test_output_size():
+    processor = ImageProcessor()
+    image = cv2.imread(str(project_root / 'examples' / 'doc3_very_low.jpg'))
+    height, width = image.shape[:2]
+    corners = np.float32([[30, 20], [width - 40, 35], [width - 25, height - 30], [20, height - 45]])
+    natural = processor.perspective_transform(image, corners)
+
+    processor.output_dpi = 72
+    assert processor.perspective_transform(image, corners).shape[:2] == (842, 595)  # A4 竖向
+    processor.output_page = 'letter'
+    assert processor.perspective_transform(image, corners).shape[:2] == (792, 612)
+    processor.output_dpi = None
+
+    processor.output_max_size = 400
+    resized = processor.perspective_transform(image, corners)
+    assert max(resized.shape[:2]) == 400
+    assert abs(resized.shape[1] / resized.shape[0] - natural.shape[1] / natural.shape[0]) < 0.01
+    # 只缩小不放大
+    processor.output_max_size = 10000
+    assert np.array_equal(processor.perspective_transform(image, corners), natural)
+    processor.output_max_size = None
+
+    processor.output_size = (300, 200)
+    assert processor.perspective_transform(image, corners, mono=True).shape == (200, 300)
+
+
+def test_view_transforms():
+    processor = ImageProcessor()
+    image = cv2.imread(str(project_root / 'examples' / 'doc3_very_low.jpg'))
+    view, expected = ImageView(image), image
+    for clockwise in (True, True, False, True):
+        view.rotate90(clockwise)
+        expected = cv2.rotate(expected, cv2.ROTATE_90_CLOCKWISE if clockwise else cv2.ROTATE_90_COUNTERCLOCKWISE)
+    assert np.array_equal(view.materialize(), expected)
+
+    # 旋转合进单应矩阵，直接从原图采样，与先旋转整张图像只差定点插值的舍入
+    height, width = expected.shape[:2]
+    corners = np.float32([[-20, 15], [width - 30, 10], [width - 10, height - 25], [25, height + 10]])
+    view = ImageView(image)
+    for _ in range(3):
+        view.rotate90(True)
+    rotated = cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    diff = np.abs(processor.perspective_transform(view, corners).astype(np.int16) -
+                  processor.perspective_transform(rotated, corners))
+    assert diff.max() <= 1 and (diff > 0).mean() < 0.001
+
+    view.crop(10, 20, 300, 200)
+    assert np.array_equal(view.materialize(), rotated[20:220, 10:310])
+    view = ImageView(image)
+    view.scale(0.5)
+    resized = cv2.resize(image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_LINEAR)
+    assert np.abs(view.materialize().astype(np.int16) - resized).max() <= 1
+
+
+def test_rotation_preview():
+    processor = ImageProcessor()
+    processor.image = cv2.imread(str(project_root / 'examples' / 'doc3_low.jpg'))
+    for clockwise in (True, True, False):
+        view = processor.rotate_image(clockwise)
+        preview = processor.preview_image(400)
+        # 旋转只记录变换，预览从源图像的缩小图采样，不采样完整分辨率的视图
+        assert not view.is_materialized
+        assert max(preview.shape[:2]) == 400
+        assert abs(preview.shape[1] / preview.shape[0] - view.size[0] / view.size[1]) < 0.01
+    expected = cv2.resize(cv2.rotate(processor.view.source, cv2.ROTATE_90_CLOCKWISE),
+                          (preview.shape[1], preview.shape[0]), interpolation=cv2.INTER_AREA)
+    assert np.abs(expected.astype(np.int16) - preview).mean() < 3
+
+
+def example_masks(size=384):
+    """没有权重时用示例图像的 Otsu 阈值代替分割掩码（有噪点、孔洞和贴边区域），再加随机四边形"""
+    for path in sorted((project_root / 'examples').glob('*.jpg')):
+        gray = cv2.cvtColor(cv2.resize(cv2.imread(str(path)), (size, size)), cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        yield mask
+        yield 1 - mask
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        mask = np.zeros((size, size), np.uint8)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 4))
+        points = rng.uniform(0.3, 0.7, 2) * size + rng.uniform(0.15, 0.7) * size * np.stack(
+            [np.cos(angles), np.sin(angles)], axis=1)
+        cv2.fillPoly(mask, [points.astype(np.int32)], 1)
+        yield mask
+
+
+def test_lean_quad_matches():
+    processor = ImageProcessor()
+    for mask in example_masks():
+        processor.quad_method = 'legacy'
+        expected = processor._mask_to_corners(mask, (3000, 2250))
+        processor.quad_method = 'lean'
+        actual = processor._mask_to_corners(mask, (3000, 2250))
+        assert np.array_equal(expected, actual)
+
+
+def main():
+    test_offframe_warp_matches()
+    test_output_size()
+    test_view_transforms()
+    test_rotation_preview()
+    test_lean_quad_matches()
+    print("不复制图像的越界处理与补零扩展的结果一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.core.batch import run_task
+from src.core.pipeline import ScanPipeline
+from src.core.processor import ImageProcessor
+from test_detect import BrightnessModel, page_photo
+
+
+class FailingWarpProcessor(ImageProcessor):
+    """宽度为 1000 的图像在透视变换阶段抛出异常"""
+
+    def perspective_transform(self, image, corners, mono=None):
+        if image.shape[1] == 1000:
+            raise ValueError("warp failed")
+        return super().perspective_transform(image, corners, mono)
+
+
+class FailingModel(BrightnessModel):
+    def forward(self, x):
+        raise RuntimeError("inference failed")
+
+
+def write_inputs(folder):
+    """写出测试输入：几张页面、一张没有页面的图像、一张无法解码的文件和一张透视变换会失败的图像"""
+    paths = []
+    for i in range(5):
+        page = page_photo([[100 + 20 * i, 80], [1000, 120 + 10 * i], [980, 800], [110, 760 - 15 * i]])
+        paths.append(str(folder / f'page{i}.png'))
+        cv2.imwrite(paths[-1], page)
+    paths.insert(2, str(folder / 'empty.png'))
+    cv2.imwrite(paths[2], np.full((900, 1200, 3), 40, np.uint8))
+    paths.insert(4, str(folder / 'broken.jpg'))
+    Path(paths[4]).write_bytes(b'not an image')
+    paths.append(str(folder / 'narrow.png'))
+    cv2.imwrite(paths[-1], page_photo([[100, 80], [900, 100], [880, 700], [120, 680]], size=(1000, 800)))
+    return paths
+
+
+def run_pipeline(pipeline, input_paths, output_paths=None, timeout=120):
+    """在线程中运行流水线，超时说明某个阶段没有收到结束标记"""
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(pipeline.run(input_paths, output_paths)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "流水线没有结束"
+    return results
+
+
+def test_pipeline_matches_serial():
+    processor = FailingWarpProcessor()
+    processor.model = BrightnessModel()
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        input_paths = write_inputs(folder)
+        expected = [run_task(processor, index, path) for index, path in enumerate(input_paths)]
+        assert [result.error for result in expected] == [
+            None, None, "Cannot detect document boundaries", None, "Cannot load image", None, None, "warp failed"]
+
+        threads_before = threading.active_count()
+        pipeline = ScanPipeline(processor, decode_threads=2, postprocess_threads=2, encode_threads=2,
+                                batch_size=2, queue_size=2)
+        results = run_pipeline(pipeline, input_paths)
+        assert threading.active_count() == threads_before
+        # 按完成顺序返回，每个索引恰好一次，且与输入路径对应
+        assert sorted(result.index for result in results) == list(range(len(input_paths)))
+        for result in sorted(results, key=lambda result: result.index):
+            serial = expected[result.index]
+            assert result.input_path == serial.input_path
+            assert result.error == serial.error, result.input_path
+            if serial.error is None:
+                assert np.array_equal(result.image, serial.image), result.input_path
+            else:
+                assert result.image is None
+
+        # 指定输出路径时由编码阶段写出，写出的文件与逐张处理的结果相同
+        output_paths = [str(folder / f'out{index}.png') for index in range(len(input_paths))]
+        results = run_pipeline(pipeline, input_paths, output_paths)
+        for result in results:
+            serial = expected[result.index]
+            assert result.output_path == output_paths[result.index] and result.image is None
+            assert result.error == serial.error
+            if serial.error is None:
+                assert np.array_equal(cv2.imread(result.output_path, cv2.IMREAD_UNCHANGED), serial.image)
+
+
+def test_pipeline_inference_error():
+    processor = ImageProcessor()
+    processor.model = FailingModel()
+    with tempfile.TemporaryDirectory() as tmp:
+        input_paths = write_inputs(Path(tmp))
+        pipeline = ScanPipeline(processor, decode_threads=3, postprocess_threads=2, batch_size=3, queue_size=1)
+        results = run_pipeline(pipeline, input_paths)
+    # 推理异常记录在整批图像的结果中，后续阶段照常收到结束标记
+    errors = {Path(result.input_path).name: result.error for result in results}
+    assert len(results) == len(input_paths)
+    assert errors.pop('broken.jpg') == "Cannot load image"
+    assert set(errors.values()) == {"inference failed"}
+
+
+def main():
+    test_pipeline_matches_serial()
+    test_pipeline_inference_error()
+    print("流水线的结果与逐张处理相同，各阶段的错误都记录在结果中")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.core.batch import run_task
+from src.core.processor import ImageProcessor
+from src.core.profiling import PageStats, aggregate_stats
+from test_detect import BrightnessModel, page_photo
+
+
+def test_stage_records():
+    processor = ImageProcessor()
+    processor.model = BrightnessModel()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'page.png')
+        cv2.imwrite(path, page_photo([[150, 100], [1050, 140], [1000, 820], [120, 780]]))
+        binary, stats = processor.process_document(path, return_stats=True)
+        assert np.array_equal(binary, processor.process_document(path))
+
+    assert isinstance(stats, PageStats)
+    names = [stage.name for stage in stats.stages]
+    assert names == ['imread', 'segmentation_preprocess', 'segmentation_forward', 'contour_extraction',
+                     'perspective_warp', 'grayscale', 'bilateral_filter', 'adaptive_threshold', 'morphology']
+    shapes = {stage.name: stage.shape for stage in stats.stages}
+    size = ImageProcessor.SEGMENTATION_SIZE
+    assert shapes['imread'] == (900, 1200, 3)
+    assert shapes['segmentation_preprocess'] == (1, 3, size, size)
+    assert shapes['segmentation_forward'] == (1, size, size)
+    assert shapes['contour_extraction'] == (1,)
+    assert shapes['perspective_warp'] == binary.shape + (3,)
+    assert shapes['grayscale'] == shapes['adaptive_threshold'] == shapes['morphology'] == binary.shape
+    for stage in stats.stages:
+        assert stage.wall >= 0 and stage.cpu >= 0
+    # uint8 数组的字节数等于元素个数，float32 的分割输入为 4 倍
+    record = {stage.name: stage for stage in stats.stages}
+    assert record['imread'].nbytes == 900 * 1200 * 3
+    assert record['segmentation_preprocess'].nbytes == 3 * size * size * 4
+    assert record['morphology'].nbytes == binary.size
+    assert stats.wall == sum(stage.wall for stage in stats.stages)
+
+    # 返回后记录已经停止
+    assert processor.stats.stop() is None
+
+
+def test_aggregate_stats():
+    processor = ImageProcessor()
+    processor.model = BrightnessModel()
+    with tempfile.TemporaryDirectory() as tmp:
+        pages = [page_photo([[150, 100], [1050, 140], [1000, 820], [120, 780]]),
+                 page_photo([[100, 80], [1500, 120], [1480, 1250], [110, 1200]], size=(1600, 1300)),
+                 page_photo([[200, 150], [900, 130], [950, 700], [180, 720]])]
+        results = []
+        for index, page in enumerate(pages):
+            path = str(Path(tmp) / f'page{index}.png')
+            cv2.imwrite(path, page)
+            results.append(run_task(processor, index, path, str(Path(tmp) / f'out{index}.png'), collect_stats=True))
+    records = [result.stats for result in results]
+    assert all(result.error is None for result in results)
+    assert all(record['stages'][-1]['name'] == 'imwrite' for record in records)
+
+    summary = aggregate_stats(records)
+    for name, aggregate in summary.items():
+        stages = [stage for record in records for stage in record['stages'] if stage['name'] == name]
+        wall = [stage['wall'] for stage in stages]
+        assert aggregate['count'] == len(stages)
+        assert np.isclose(aggregate['wall_total'], sum(wall))
+        assert np.isclose(aggregate['wall_mean'], sum(wall) / len(wall))
+        assert min(wall) <= aggregate['wall_p50'] <= aggregate['wall_p95'] <= max(wall)
+        assert np.isclose(aggregate['cpu_total'], sum(stage['cpu'] for stage in stages))
+        assert np.isclose(aggregate['nbytes_mean'], np.mean([stage['nbytes'] for stage in stages]))
+    # 每页都有的阶段计数为页数；短边 1000 以上的页面不做双边滤波
+    assert summary['imread']['count'] == summary['morphology']['count'] == len(pages)
+    assert summary['bilateral_filter']['count'] == 2
+    assert np.isclose(sum(aggregate['wall_total'] for aggregate in summary.values()),
+                      sum(sum(stage['wall'] for stage in record['stages']) for record in records))
+
+
+def main():
+    test_stage_records()
+    test_aggregate_stats()
+    print("阶段记录的名称和输出形状正确，多页汇总与逐页记录相加一致")
+
+
+if __name__ == "__main__":
+    main()
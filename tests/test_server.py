@@ -0,0 +1,117 @@
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.core.processor import ImageProcessor
+from src.scan_server import MicroBatcher, ScanServer
+from test_detect import BrightnessModel, page_photo
+
+
+def test_micro_batches():
+    async def run():
+        batches = []
+
+        def infer(items):
+            batches.append(len(items))
+            return [item * 2 for item in items]
+
+        executor = ThreadPoolExecutor(1)
+        batcher = MicroBatcher(infer, executor, max_batch_size=4, max_wait=0.05)
+        batcher.start()
+        try:
+            results = await asyncio.gather(*(batcher.submit(item) for item in range(10)))
+        finally:
+            await batcher.stop()
+            executor.shutdown()
+        return batches, results
+
+    batches, results = asyncio.run(run())
+    assert batches == [4, 4, 2]
+    assert results == [item * 2 for item in range(10)]
+
+
+def test_server_batches_requests():
+    processor = ImageProcessor()
+    processor.model = BrightnessModel()
+    pages = [page_photo([[100 + 10 * i, 80], [1000, 120 + 5 * i], [980, 800], [110, 760 - 8 * i]])
+             for i in range(12)]
+    expected = [processor.binarize(processor.perspective_transform(page, corners))
+                for page, corners in zip(pages, processor.detect_documents(pages))]
+
+    async def run():
+        # 默认 DETECT_BATCH_SIZE 为 8，max_batch_size 为 12 时一个微批次也只做一次推理
+        server = ScanServer(processor, max_batch_size=12, max_wait=0.5, workers=2)
+        await server.start(port=0)
+        try:
+            processor.model.sizes.clear()
+            bodies = [cv2.imencode('.png', page)[1].tobytes() for page in pages]
+            responses = await asyncio.gather(*(server.dispatch('POST', '/scan', body) for body in bodies))
+            return responses, list(server.detect_batcher.batch_sizes), len(processor.model.sizes)
+        finally:
+            await server.stop()
+
+    responses, batch_sizes, forward_passes = asyncio.run(run())
+    assert batch_sizes == [12] and forward_passes == 1
+    for (status, _, payload), binary in zip(responses, expected):
+        assert status == 200
+        assert np.array_equal(cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_UNCHANGED), binary)
+
+
+def test_bad_requests():
+    async def send(port, request):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(request)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def run():
+        server = ScanServer(ImageProcessor(), workers=1)
+        tcp_server = await server.start(port=0)
+        port = tcp_server.sockets[0].getsockname()[1]
+        try:
+            format_response = await server.dispatch('POST', '/scan?format=bmp', b'')
+            responses = [await send(port, request) for request in (
+                b'GARBAGE\r\n\r\n',
+                b'POST /scan HTTP/1.1 extra\r\n\r\n',
+                b'POST /scan HTTP/1.1\r\nContent-Length: abc\r\n\r\n',
+                b'POST /scan HTTP/1.1\r\nContent-Length: -5\r\n\r\n',
+            )]
+        finally:
+            tcp_server.close()
+            await tcp_server.wait_closed()
+            await server.stop()
+        return format_response, responses
+
+    format_response, responses = asyncio.run(run())
+    # 不支持的输出格式不再默认换成 PNG
+    status, content_type, payload = format_response
+    assert status == 400 and content_type == 'application/json'
+    assert 'bmp' in json.loads(payload)['error']
+    # 请求行或 Content-Length 格式错误时返回 400 和错误信息后关闭连接
+    for response in responses:
+        head, _, body = response.partition(b'\r\n\r\n')
+        assert head.startswith(b'HTTP/1.1 400 Bad Request'), response
+        assert b'Connection: close' in head
+        assert json.loads(body)['error']
+
+
+def main():
+    test_micro_batches()
+    test_server_batches_requests()
+    test_bad_requests()
+    print("并发请求按微批次合并，每个批次一次推理，结果与逐张处理相同")
+
+
+if __name__ == "__main__":
+    main()
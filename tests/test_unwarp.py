@@ -0,0 +1,129 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.core.model import UVDocnet
+from src.core.processor import ImageProcessor
+from src.core.utils import bilinear_unwarping, bilinear_unwarping_bands, remap_unwarping
+
+
+def random_grid(batch=1, rows=45, cols=31):
+    """在单位网格上叠加随机扰动，模拟 UVDocnet 输出的 2D 网格"""
+    torch.manual_seed(0)
+    ys, xs = torch.meshgrid(torch.linspace(-1, 1, rows), torch.linspace(-1, 1, cols), indexing='ij')
+    grid = torch.stack([xs, ys]).expand(batch, 2, rows, cols)
+    return grid + torch.randn(batch, 2, rows, cols) * 0.03
+
+
+def test_drop_3d_head_matches():
+    torch.manual_seed(0)
+    model = UVDocnet(num_filter=32, kernel_size=5).eval()
+    inp = torch.rand(1, 3, 712, 488)
+    with torch.no_grad():
+        expected, _ = model(inp)
+        outputs = model.drop_3d_head()(inp)
+    # 去掉 3D 输出头后只返回 2D 网格，结果与完整模型的 2D 输出完全相同
+    assert len(outputs) == 1
+    assert torch.equal(expected, outputs[0])
+
+
+def test_tiled_unwarping_matches():
+    grid = random_grid(batch=2)
+    for height, width in [(1710, 1279), (928, 695)]:
+        warped = torch.rand(2, 3, height, width)
+        expected = bilinear_unwarping(warped, grid, (width, height))
+        for budget in (1 << 20, 16 << 20, 1 << 30):
+            bands = list(bilinear_unwarping_bands(warped, grid, (width, height), budget))
+            actual = torch.cat([band for _, _, band in bands], dim=3)
+            assert bands[-1][1] == width
+            assert torch.equal(expected, actual), f"{width}x{height}，内存预算 {budget} 字节"
+
+
+def test_tiled_processor_matches():
+    processor = ImageProcessor()
+    processor.device = torch.device('cpu')
+    torch.manual_seed(0)
+    processor.unwarp_model = UVDocnet(num_filter=32, kernel_size=5).eval()
+    processor.unwarp_model.drop_3d_head()
+
+    image = np.random.default_rng(0).integers(0, 256, (1200, 900, 3), dtype=np.uint8)
+    expected = processor.unwarp_document(image)
+    processor.unwarp_memory_budget = 1 << 20
+    actual = processor.unwarp_document(image)
+    assert np.array_equal(expected, actual)
+
+
+def test_unwarp_output_size():
+    processor = ImageProcessor()
+    processor.device = torch.device('cpu')
+    torch.manual_seed(0)
+    processor.unwarp_model = UVDocnet(num_filter=32, kernel_size=5).eval()
+    processor.unwarp_model.drop_3d_head()
+    processor.output_max_size = 600
+
+    image = np.random.default_rng(0).integers(0, 256, (1200, 900, 3), dtype=np.uint8)
+    expected = processor.unwarp_document(image)
+    assert expected.shape == (600, 450, 3)
+    processor.unwarp_memory_budget = 1 << 20
+    assert np.array_equal(expected, processor.unwarp_document(image))
+    processor.unwarp_backend = 'remap'
+    assert processor.unwarp_document(image).shape == (600, 450, 3)
+
+
+def test_batched_unwarp_matches():
+    processor = ImageProcessor()
+    processor.device = torch.device('cpu')
+    torch.manual_seed(0)
+    processor.unwarp_model = UVDocnet(num_filter=32, kernel_size=5).eval()
+    processor.unwarp_model.drop_3d_head()
+
+    # 尺寸相同的页面在同一批次中按尺寸分组一起重采样
+    rng = np.random.default_rng(0)
+    pages = [rng.integers(0, 256, shape, dtype=np.uint8)
+             for shape in [(900, 700, 3), (600, 500, 3), (900, 700, 3), (480, 640, 3), (600, 500, 3)]]
+    for backend, budget in (('torch', None), ('torch', 1 << 20), ('remap', None)):
+        processor.unwarp_backend, processor.unwarp_memory_budget = backend, budget
+        expected = [processor.unwarp_document(page) for page in pages]
+        for batch_size in (2, len(pages)):
+            actual = processor.unwarp_documents(pages, batch_size)
+            for single, batched in zip(expected, actual):
+                assert np.array_equal(single, batched), f"{backend}，内存预算 {budget}，批大小 {batch_size}"
+
+
+def test_remap_unwarping_close():
+    grid = random_grid()
+    image = cv2.imread(str(project_root / 'examples' / 'doc1_low.jpg'))
+    height, width = image.shape[:2]
+
+    img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).astype(np.float32) / 255
+    unwarped = bilinear_unwarping(torch.from_numpy(img_rgb.transpose(2, 0, 1))[None], grid, (width, height))
+    expected = cv2.cvtColor((unwarped[0].numpy().transpose(1, 2, 0) * 255).astype(np.uint8), cv2.COLOR_RGB2BGR)
+    actual = remap_unwarping(image, grid, 1 << 20)
+
+    # torch 路径截断取整、remap 四舍五入，坐标量化到 1/32 像素，差异只在几个灰度级以内
+    diff = np.abs(expected.astype(np.int16) - actual.astype(np.int16))
+    print(f"remap 与 grid_sample 差异: 平均 {diff.mean():.3f}，最大 {diff.max()}")
+    assert diff.mean() < 1.0
+    assert np.percentile(diff, 99.9) <= 2
+    assert diff.max() <= 8
+
+
+def main():
+    test_drop_3d_head_matches()
+    test_tiled_unwarping_matches()
+    test_tiled_processor_matches()
+    test_unwarp_output_size()
+    test_batched_unwarp_matches()
+    print("分块重采样结果与整图重采样一致")
+    test_remap_unwarping_close()
+
+
+if __name__ == "__main__":
+    main()